@@ -0,0 +1,418 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+GIF encoder that builds one shared palette for all frames, maps pixels to it
+and writes the LZW-compressed GIF stream directly
+"""
+
+import io
+
+import numpy as np
+
+# Numba is optional - without it the kernels still run, just as plain
+# (slow) Python, so callers should check NUMBA_AVAILABLE and fall back
+# to imageio instead
+try:
+    from numba import config as numba_config, njit, prange
+    NUMBA_AVAILABLE = True
+    # Kernels run on preview/save worker threads; prefer OpenMP over TBB,
+    # which can hang at interpreter exit after being used off the main thread
+    numba_config.THREADING_LAYER_PRIORITY = ["omp", "tbb", "workqueue"]
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that returns the function unchanged"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+    prange = range
+
+# GIF codes are at most 12 bits wide
+MAX_LZW_CODE = 4095
+
+
+def palette_size_for_quality(quality):
+    """Return the number of palette colors to use for a quality factor from 0-1"""
+    if quality >= 0.9:
+        return 256
+    if quality >= 0.75:
+        return 128
+    if quality >= 0.5:
+        return 64
+    return 32
+
+
+@njit(cache=True)
+def _kmeans_palette(samples, centers, iterations):
+    """Refine palette centers with a few Lloyd iterations over the samples"""
+    n_samples = samples.shape[0]
+    n_centers = centers.shape[0]
+    sums = np.zeros((n_centers, 3), np.float64)
+    counts = np.zeros(n_centers, np.int64)
+
+    for _ in range(iterations):
+        sums[:] = 0
+        counts[:] = 0
+        for s in range(n_samples):
+            r = samples[s, 0]
+            g = samples[s, 1]
+            b = samples[s, 2]
+            best = 0
+            best_dist = 1 << 30
+            for c in range(n_centers):
+                dr = r - centers[c, 0]
+                dg = g - centers[c, 1]
+                db = b - centers[c, 2]
+                dist = dr * dr + dg * dg + db * db
+                if dist < best_dist:
+                    best_dist = dist
+                    best = c
+            sums[best, 0] += r
+            sums[best, 1] += g
+            sums[best, 2] += b
+            counts[best] += 1
+
+        # Move every used center to the mean of its samples
+        for c in range(n_centers):
+            if counts[c] > 0:
+                centers[c, 0] = int(sums[c, 0] / counts[c] + 0.5)
+                centers[c, 1] = int(sums[c, 1] / counts[c] + 0.5)
+                centers[c, 2] = int(sums[c, 2] / counts[c] + 0.5)
+
+    return centers
+
+
+def build_palette(frames, n_colors=256, max_samples=65536, iterations=6):
+    """Build one palette shared by all frames
+
+    Args:
+        frames: Sequence of (H, W, 3) uint8 RGB frames (or an (N, H, W, 3) array)
+        n_colors: Palette size, a power of two between 2 and 256
+        max_samples: Upper bound on the number of pixels sampled for clustering
+        iterations: Number of k-means refinement passes
+
+    Returns:
+        (n_colors, 3) uint8 palette
+    """
+    n_frames = len(frames)
+    height, width = frames[0].shape[:2]
+
+    # Take a strided subsample across frames and pixels so the palette cost
+    # does not grow with the length of the GIF
+    frame_stride = max(1, n_frames // 16)
+    sampled = range(0, n_frames, frame_stride)
+    pixel_stride = max(1, (len(sampled) * height * width) // max_samples)
+    samples = np.concatenate(
+        [np.asarray(frames[i]).reshape(-1, 3)[::pixel_stride] for i in sampled])
+
+    colors, counts = np.unique(samples, axis=0, return_counts=True)
+    palette = np.zeros((n_colors, 3), np.uint8)
+
+    if len(colors) <= n_colors:
+        # Few enough distinct colors to keep them all exactly
+        palette[:len(colors)] = colors
+        return palette
+
+    # Seed the clusters with the most frequent colors, then refine
+    centers = colors[np.argsort(-counts)[:n_colors]].astype(np.int32)
+    centers = _kmeans_palette(samples.astype(np.int32), centers, iterations)
+    palette[:] = np.clip(centers, 0, 255)
+    return palette
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _quantize_kernel(frames, palette):
+    """Map every pixel of an (N, H, W, 3) frame stack to its nearest palette index"""
+    n_frames, height, width = frames.shape[0], frames.shape[1], frames.shape[2]
+    n_colors = palette.shape[0]
+    indices = np.empty((n_frames, height, width), np.uint8)
+
+    for i in prange(n_frames):
+        for y in range(height):
+            for x in range(width):
+                r = np.int32(frames[i, y, x, 0])
+                g = np.int32(frames[i, y, x, 1])
+                b = np.int32(frames[i, y, x, 2])
+                best = 0
+                best_dist = np.int32(1 << 30)
+                for c in range(n_colors):
+                    dr = r - palette[c, 0]
+                    dg = g - palette[c, 1]
+                    db = b - palette[c, 2]
+                    dist = dr * dr + dg * dg + db * db
+                    if dist < best_dist:
+                        best_dist = dist
+                        best = c
+                indices[i, y, x] = best
+
+    return indices
+
+
+@njit(cache=True)
+def build_lut(palette):
+    """Precompute the nearest palette index for every cell of a 32x32x32 RGB grid"""
+    n_colors = palette.shape[0]
+    lut = np.empty((32, 32, 32), np.uint8)
+
+    for r in range(32):
+        for g in range(32):
+            for b in range(32):
+                # Compare against the middle of the cell rather than its corner
+                cr = (r << 3) + 4
+                cg = (g << 3) + 4
+                cb = (b << 3) + 4
+                best = 0
+                best_dist = 1 << 30
+                for c in range(n_colors):
+                    dr = cr - palette[c, 0]
+                    dg = cg - palette[c, 1]
+                    db = cb - palette[c, 2]
+                    dist = dr * dr + dg * dg + db * db
+                    if dist < best_dist:
+                        best_dist = dist
+                        best = c
+                lut[r, g, b] = best
+
+    return lut
+
+
+@njit(parallel=True, cache=True)
+def map_via_lut(frames, lut):
+    """Map an (N, H, W, 3) frame stack to palette indices through a 5-bit RGB lookup table"""
+    n_frames, height, width = frames.shape[0], frames.shape[1], frames.shape[2]
+    indices = np.empty((n_frames, height, width), np.uint8)
+
+    for i in prange(n_frames):
+        for y in range(height):
+            for x in range(width):
+                indices[i, y, x] = lut[frames[i, y, x, 0] >> 3,
+                                       frames[i, y, x, 1] >> 3,
+                                       frames[i, y, x, 2] >> 3]
+
+    return indices
+
+
+# Palettes this small are mapped through build_lut/map_via_lut; dropping the
+# low 3 bits per channel is invisible at that color count, and the table costs
+# 32K searches instead of one per pixel
+LUT_MAX_COLORS = 128
+
+
+def quantize_frames(frames, palette):
+    """Return (N, H, W) uint8 palette indices for a sequence of RGB frames"""
+    if isinstance(frames, np.ndarray):
+        stack = np.ascontiguousarray(frames, dtype=np.uint8)
+    else:
+        stack = np.stack(frames).astype(np.uint8, copy=False)
+    if len(palette) <= LUT_MAX_COLORS:
+        return map_via_lut(stack, build_lut(palette.astype(np.int32)))
+    return _quantize_kernel(stack, palette.astype(np.int32))
+
+
+@njit(cache=True)
+def _lzw_encode(pixels, min_code_size):
+    """LZW-compress a flat array of palette indices into GIF code bytes"""
+    clear_code = 1 << min_code_size
+    end_code = clear_code + 1
+
+    # Dictionary of (prefix code, next index) -> code; the generation stamp
+    # lets a clear reset the table without rewriting all of it
+    codes = np.zeros(4096 * 256, np.int16)
+    generation = np.zeros(4096 * 256, np.int32)
+    current_gen = 1
+
+    out = np.empty(pixels.shape[0] * 2 + 16, np.uint8)
+    out_pos = 0
+    bit_buffer = 0
+    bit_count = 0
+
+    code_size = min_code_size + 1
+    max_code = end_code
+
+    # Start with a clear code
+    bit_buffer |= clear_code << bit_count
+    bit_count += code_size
+    while bit_count >= 8:
+        out[out_pos] = bit_buffer & 0xFF
+        out_pos += 1
+        bit_buffer >>= 8
+        bit_count -= 8
+
+    prefix = np.int32(pixels[0])
+    for p in range(1, pixels.shape[0]):
+        value = np.int32(pixels[p])
+        key = prefix * 256 + value
+        if generation[key] == current_gen:
+            prefix = np.int32(codes[key])
+            continue
+
+        # Emit the current prefix and add the extended string to the table
+        bit_buffer |= prefix << bit_count
+        bit_count += code_size
+        while bit_count >= 8:
+            out[out_pos] = bit_buffer & 0xFF
+            out_pos += 1
+            bit_buffer >>= 8
+            bit_count -= 8
+
+        max_code += 1
+        codes[key] = max_code
+        generation[key] = current_gen
+        if max_code >= (1 << code_size) and code_size < 12:
+            code_size += 1
+
+        if max_code == MAX_LZW_CODE:
+            # Table is full - emit a clear code and start over
+            bit_buffer |= clear_code << bit_count
+            bit_count += code_size
+            while bit_count >= 8:
+                out[out_pos] = bit_buffer & 0xFF
+                out_pos += 1
+                bit_buffer >>= 8
+                bit_count -= 8
+            current_gen += 1
+            code_size = min_code_size + 1
+            max_code = end_code
+
+        prefix = value
+
+    # Flush the last prefix and the end-of-information code
+    bit_buffer |= prefix << bit_count
+    bit_count += code_size
+    while bit_count >= 8:
+        out[out_pos] = bit_buffer & 0xFF
+        out_pos += 1
+        bit_buffer >>= 8
+        bit_count -= 8
+    bit_buffer |= end_code << bit_count
+    bit_count += code_size
+    while bit_count > 0:
+        out[out_pos] = bit_buffer & 0xFF
+        out_pos += 1
+        bit_buffer >>= 8
+        bit_count -= 8
+
+    return out[:out_pos]
+
+
+def _frame_delays(n_frames, fps):
+    """Per-frame delays in centiseconds, spreading rounding error over the frames"""
+    times = np.round(np.arange(n_frames + 1) * 100.0 / fps).astype(np.int64)
+    return np.maximum(np.diff(times), 1)
+
+
+def write_gif(output_path, indices, palette, fps, loop_param=0, progress_callback=None):
+    """Write palette-indexed frames to a GIF file
+
+    Args:
+        output_path: Path to save the output GIF
+        indices: (N, H, W) uint8 palette indices
+        palette: (n_colors, 3) uint8 palette, n_colors a power of two
+        fps: Frames per second
+        loop_param: 0 loops forever, anything else plays the GIF once
+        progress_callback: Optional function called with 0-100 after each frame;
+                           returning False stops writing
+
+    Returns:
+        True if every frame was written, False if stopped by progress_callback
+    """
+    with open(output_path, 'wb') as f:
+        return _write_gif_stream(f, indices, palette, fps, loop_param, progress_callback)
+
+
+def encode_gif(indices, palette, fps, loop_param=0):
+    """Return palette-indexed frames encoded as GIF bytes, for playing from memory"""
+    stream = io.BytesIO()
+    _write_gif_stream(stream, indices, palette, fps, loop_param)
+    return stream.getvalue()
+
+
+def _write_gif_stream(f, indices, palette, fps, loop_param=0, progress_callback=None):
+    """Write the GIF stream for write_gif or encode_gif to a binary file object"""
+    n_frames, height, width = indices.shape
+    n_colors = len(palette)
+    color_bits = max(1, int(np.ceil(np.log2(n_colors))))
+    min_code_size = max(2, color_bits)
+
+    table = np.zeros((1 << color_bits, 3), np.uint8)
+    table[:n_colors] = palette
+
+    # Header, logical screen descriptor and global color table
+    f.write(b'GIF89a')
+    f.write(np.array([width, height], '<u2').tobytes())
+    f.write(bytes([0x80 | ((color_bits - 1) << 4) | (color_bits - 1), 0, 0]))
+    f.write(table.tobytes())
+
+    # NETSCAPE extension makes the GIF loop forever
+    if loop_param == 0:
+        f.write(b'\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00')
+
+    for i, delay in enumerate(_frame_delays(n_frames, fps)):
+        # Graphic control extension with the frame delay
+        f.write(b'\x21\xf9\x04\x04')
+        f.write(np.array([delay], '<u2').tobytes())
+        f.write(b'\x00\x00')
+
+        # Image descriptor covering the whole canvas
+        f.write(b'\x2c')
+        f.write(np.array([0, 0, width, height], '<u2').tobytes())
+        f.write(b'\x00')
+
+        # LZW data split into sub-blocks of at most 255 bytes, written
+        # as views of the encoder output rather than copied bytes
+        data = memoryview(_lzw_encode(indices[i].ravel(), min_code_size))
+        f.write(bytes([min_code_size]))
+        for start in range(0, len(data), 255):
+            chunk = data[start:start + 255]
+            f.write(bytes([len(chunk)]))
+            f.write(chunk)
+        f.write(b'\x00')
+
+        if progress_callback and progress_callback(int((i + 1) * 100 / n_frames)) is False:
+            return False
+
+    f.write(b'\x3b')
+    return True
+
+
+def save_gif(output_path, frames, fps, quality, loop_param=0, palette=None, indices=None,
+             progress_callback=None):
+    """Encode RGB frames to a GIF, preferring the compiled palette+LZW encoder
+
+    Args:
+        output_path: Path to save the output GIF
+        frames: Sequence of (H, W, 3) uint8 RGB frames
+        fps: Frames per second
+        quality: Quality factor from 0-1
+        loop_param: 0 loops forever, anything else plays the GIF once
+        palette: Optional palette already computed for these frames
+        indices: Optional palette indices matching palette
+        progress_callback: Optional function called with 0-100 after each frame;
+                           returning False stops writing
+
+    Returns:
+        True if every frame was written, False if stopped by progress_callback
+    """
+    if NUMBA_AVAILABLE:
+        try:
+            if palette is None or indices is None:
+                palette = build_palette(frames, palette_size_for_quality(quality))
+                indices = quantize_frames(frames, palette)
+            return write_gif(output_path, indices, palette, fps, loop_param,
+                             progress_callback=progress_callback)
+        except Exception as e:
+            print(f"Fast GIF encoder failed, falling back to imageio: {e}")
+
+    # Stream frames into the writer instead of handing over the whole list
+    import imageio
+    with imageio.get_writer(output_path, mode='I', fps=fps,
+                            quantizer=int(100-quality*100),
+                            loop=loop_param) as writer:
+        for i, frame in enumerate(frames):
+            writer.append_data(frame)
+            if progress_callback and progress_callback(int((i + 1) * 100 / len(frames))) is False:
+                return False
+    return True
@@ -8,18 +8,46 @@ GIF Creator - A simple yet powerful video editor for creating optimized GIFs
 import sys
 import os
 import json
+import time
+import functools
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QSlider, QFileDialog, 
                              QLabel, QSpinBox, QDoubleSpinBox, QComboBox, QMessageBox,
                              QSplitter, QCheckBox, QFrame, QSizePolicy, QProgressDialog,
                              QMenu, QAction, QInputDialog, QStyleFactory, QShortcut)
-from PyQt5.QtCore import Qt, QTimer, QSize, QUrl, QDir, QSettings
+from PyQt5.QtCore import Qt, QTimer, QSize, QUrl, QDir, QSettings, QThread, QObject, QSignalBlocker, pyqtSignal
 from PyQt5.QtGui import QPixmap, QImage, QIcon, QKeySequence
 
+import numpy as np
+
+import gif_encoder
 from video_processor import VideoProcessor
 from preview_widget import PreviewWidget
 from timeline_widget import TimelineWidget
 
+@functools.lru_cache(maxsize=256)
+def _estimate_mb(fps, width, height, quality, speed, duration_ms):
+    """Estimate the GIF size in MB from integer settings
+
+    Args:
+        fps: Frames per second
+        width: Output width in pixels
+        height: Output height in pixels
+        quality: Quality from 1-100
+        speed: Playback speed in percent; higher speed = fewer frames
+        duration_ms: Trimmed duration in milliseconds
+    """
+    frames = int(duration_ms * fps / (speed / 100.0) / 1000)
+    bytes_per_pixel = 3 * quality / 100.0  # Rough estimate, 3 bytes per pixel at max quality
+    return (width * height * frames * bytes_per_pixel) / (1024 * 1024)  # Convert to MB
+
+def _excluded_duration(segments, start_time, end_time):
+    """Total length of the (N, 2) excluded segments that falls inside the trim range"""
+    if len(segments) == 0:
+        return 0.0
+    clipped = np.clip(segments, start_time, end_time)
+    return float(np.sum(clipped[:, 1] - clipped[:, 0]))
+
 class PresetManager:
     """Manage output settings presets"""
     def __init__(self, settings):
@@ -37,10 +65,14 @@ class PresetManager:
                 {"name": "Compressed", "fps": 15, "quality": 70, "resolution": "480p", "speed": 100},
             ]
             self.settings.setValue("presets", presets)
-        # Add speed value to older presets that might not have it
-        for preset in presets:
-            if "speed" not in preset:
-                preset["speed"] = 100
+        else:
+            # Add speed value to older presets that might not have it, and
+            # only write back when something actually changed
+            needs_fix = [p for p in presets if "speed" not in p]
+            if needs_fix:
+                for preset in needs_fix:
+                    preset["speed"] = 100
+                self.settings.setValue("presets", presets)
         return presets
     
     def save_preset(self, name, fps, quality, resolution, speed=100):
@@ -52,7 +84,11 @@ class PresetManager:
             "resolution": resolution,
             "speed": speed
         }
-        self.presets.append(preset)
+        self.save_many([preset])
+    
+    def save_many(self, presets):
+        """Append several presets and persist them with a single write"""
+        self.presets.extend(presets)
         self.settings.setValue("presets", self.presets)
     
     def get_presets(self):
@@ -61,9 +97,164 @@ class PresetManager:
     
     def delete_preset(self, name):
         """Delete a preset by name"""
-        self.presets = [p for p in self.presets if p["name"] != name]
+        self.delete_many([name])
+    
+    def delete_many(self, names):
+        """Delete several presets by name and persist them with a single write"""
+        names = set(names)
+        self.presets = [p for p in self.presets if p["name"] not in names]
         self.settings.setValue("presets", self.presets)
 
+class ThumbnailWorker(QThread):
+    """Decode timeline thumbnails in the background and emit them one by one"""
+
+    # Slot index and (H, W, 3) RGB thumbnail
+    thumbnail_ready = pyqtSignal(int, object)
+
+    def __init__(self, video_processor, parent=None):
+        super().__init__(parent)
+        self.video_processor = video_processor
+
+    def run(self):
+        """Extract thumbnails until done or interrupted"""
+        try:
+            for index, thumbnail in self.video_processor.iter_thumbnails():
+                if self.isInterruptionRequested():
+                    break
+                self.thumbnail_ready.emit(index, thumbnail)
+        except Exception as e:
+            print(f"Error generating thumbnails: {e}")
+
+class GifSaveWorker(QObject):
+    """Encode and write a GIF off the UI thread"""
+    
+    progress = pyqtSignal(int)
+    done = pyqtSignal(str)
+    error = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    
+    def __init__(self, output_path, frames, fps, quality, loop_param, palette=None, indices=None):
+        super().__init__()
+        self.output_path = output_path
+        self.frames = frames
+        self.fps = fps
+        self.quality = quality
+        self.loop_param = loop_param
+        self.palette = palette
+        self.indices = indices
+        self._cancelled = False
+    
+    def cancel(self):
+        """Ask the running save to stop after the current frame"""
+        self._cancelled = True
+    
+    def _on_progress(self, percent):
+        """Map write progress onto 50-100% and report whether to continue"""
+        self.progress.emit(50 + percent // 2)
+        return not self._cancelled
+    
+    def run(self):
+        """Write the GIF and report the outcome through signals"""
+        try:
+            completed = gif_encoder.save_gif(self.output_path, self.frames, self.fps,
+                                             self.quality, self.loop_param,
+                                             self.palette, self.indices,
+                                             progress_callback=self._on_progress)
+        except Exception as e:
+            self.error.emit(str(e))
+            return
+        
+        if completed:
+            self.done.emit(self.output_path)
+        else:
+            # Don't leave a truncated GIF behind
+            if os.path.exists(self.output_path):
+                os.remove(self.output_path)
+            self.cancelled.emit()
+
+class PreviewWorker(QObject):
+    """Collect and quantize preview frames off the UI thread"""
+    
+    progress = pyqtSignal(int)
+    # Frames, adjusted fps, palette/indices and the preview encoded as GIF
+    # bytes (the last three None when numba is missing)
+    done = pyqtSignal(object, float, object, object, object)
+    error = pyqtSignal(str)
+    
+    def __init__(self, video_processor, params, stream=None):
+        super().__init__()
+        self.video_processor = video_processor
+        self.params = params
+        # Optional FrameStream the frames are also played from while decoding
+        self.stream = stream
+        self.cancelled = False
+    
+    def cancel(self):
+        """Stop decoding early; done is still emitted with the frames so far"""
+        self.cancelled = True
+    
+    def run(self):
+        """Generate the preview with a capture of its own and report the result"""
+        reader = None
+        try:
+            reader = self.video_processor.open_reader()
+            # Frames are copied into one array sized for the whole preview as
+            # they stream in; quantizing, playback and saving all use that
+            # array (the filled prefix) without stacking another copy
+            width, height = self.params["dimensions"]
+            capacity = reader.preview_frame_count(
+                self.params["start_time"], self.params["end_time"], self.params["fps"],
+                self.params.get("segments"), self.params["speed_factor"])
+            buffer = np.empty((capacity, height, width, 3), np.uint8)
+            count = 0
+            streaming = self.stream is not None
+            for frame in reader.generate_preview_iter(progress_callback=self.progress.emit, **self.params):
+                if self.cancelled:
+                    break
+                buffer[count] = frame
+                if streaming:
+                    streaming = self.stream.put(buffer[count])
+                count += 1
+            preview_frames = buffer[:count]
+            adjusted_fps = self.params["fps"] * self.params["speed_factor"]
+            if self.cancelled:
+                # Nobody will play a cancelled preview
+                palette = indices = movie_data = None
+            else:
+                palette, indices = self._quantize(preview_frames)
+                movie_data = self._encode(palette, indices, adjusted_fps)
+        except Exception as e:
+            self.error.emit(str(e))
+            return
+        finally:
+            if reader is not None:
+                reader.release()
+        self.done.emit(preview_frames, adjusted_fps, palette, indices, movie_data)
+    
+    def _quantize(self, frames):
+        """Build the palette and index arrays for the preview so saving can reuse them"""
+        if len(frames) == 0 or not gif_encoder.NUMBA_AVAILABLE:
+            return None, None
+        
+        try:
+            palette = gif_encoder.build_palette(
+                frames, gif_encoder.palette_size_for_quality(self.params["quality"]))
+            return palette, gif_encoder.quantize_frames(frames, palette)
+        except Exception as e:
+            print(f"Could not quantize preview frames: {e}")
+            return None, None
+    
+    def _encode(self, palette, indices, fps):
+        """Encode the quantized preview so Qt can play it without a Python tick per frame"""
+        if palette is None:
+            return None
+        
+        try:
+            return gif_encoder.encode_gif(indices, palette, fps)
+        except Exception as e:
+            print(f"Could not encode preview frames: {e}")
+            return None
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -71,13 +262,50 @@ class MainWindow(QMainWindow):
         # Initialize settings
         self.settings = QSettings("GIFCreator", "GIFEditor")
         self.preset_manager = PresetManager(self.settings)
-        self.recent_files = self.settings.value("recent_files", [])
+        self.recent_files = self._load_recent_files()
         self.max_recent_files = 5
+        # Set while a recent files write is queued
+        self._recent_files_dirty = False
         
         self.video_processor = VideoProcessor()
+        self._thumbnail_worker = None
+        self._save_thread = None
+        self._save_worker = None
+        self._save_progress = None
+        self._preview_thread = None
+        self._preview_worker = None
+        self._preview_message = ""
+        # Bumped whenever the preview settings change; a preview only caches
+        # its palette if the settings it was started with are still current
+        self._params_generation = 0
+        self._preview_generation = 0
+        # Bumped on every video load, so a preview of the previous video that
+        # finishes afterwards is ignored
+        self._load_generation = 0
+        self._preview_load_generation = 0
         self.current_file = None
         self.output_file = None
         self.excluded_segments = []  # List of time segments to exclude
+        self._excluded_array = np.empty((0, 2))  # Same segments as an (N, 2) array
+
+        # Debounce timers so slider drags only recompute once they settle
+        self._size_estimate_timer = QTimer(self)
+        self._size_estimate_timer.setSingleShot(True)
+        self._size_estimate_timer.setInterval(100)
+        self._size_estimate_timer.timeout.connect(self._do_update_size_estimate)
+
+        self._preview_params_timer = QTimer(self)
+        self._preview_params_timer.setSingleShot(True)
+        self._preview_params_timer.setInterval(100)
+        self._preview_params_timer.timeout.connect(self._do_update_preview_params)
+
+        # Throttle frame seeks while a trim handle is dragged (~6 per second)
+        self._pending_trim = None
+        self._trim_seek_timer = QTimer(self)
+        self._trim_seek_timer.setSingleShot(True)
+        self._trim_seek_timer.setInterval(166)
+        self._trim_seek_timer.timeout.connect(self._apply_pending_trim)
+
         self.initUI()
         
         # Restore window geometry
@@ -126,6 +354,7 @@ class MainWindow(QMainWindow):
         # Create timeline widget
         self.timeline_widget = TimelineWidget()
         self.timeline_widget.trim_changed.connect(self.on_trim_changed)
+        self.timeline_widget.trim_released.connect(self.on_trim_released)
         self.timeline_widget.segments_changed.connect(self.on_segments_changed)
         preview_layout.addWidget(self.timeline_widget)
         
@@ -141,7 +370,7 @@ class MainWindow(QMainWindow):
         self.fps_spin = QSpinBox()
         self.fps_spin.setRange(1, 60)
         self.fps_spin.setValue(15)
-        self.fps_spin.valueChanged.connect(self.update_preview_params)
+        self.fps_spin.valueChanged.connect(self.update_preview_params, Qt.DirectConnection)
         fps_layout.addWidget(fps_label)
         fps_layout.addWidget(self.fps_spin)
         fps_layout.addStretch()
@@ -152,10 +381,8 @@ class MainWindow(QMainWindow):
         self.speed_slider = QSlider(Qt.Horizontal)
         self.speed_slider.setRange(25, 400)  # 0.25x to 4.0x
         self.speed_slider.setValue(100)  # Default 1.0x
-        self.speed_slider.valueChanged.connect(self.update_preview_params)
         self.speed_value = QLabel("1.0x")
-        self.speed_slider.valueChanged.connect(
-            lambda v: self.speed_value.setText(f"{v/100:.1f}x"))
+        self.speed_slider.valueChanged.connect(self._on_speed_changed, Qt.DirectConnection)
             
         speed_layout.addWidget(speed_label)
         speed_layout.addWidget(self.speed_slider)
@@ -212,10 +439,8 @@ class MainWindow(QMainWindow):
         self.quality_slider = QSlider(Qt.Horizontal)
         self.quality_slider.setRange(1, 100)
         self.quality_slider.setValue(90)
-        self.quality_slider.valueChanged.connect(self.update_preview_params)
         self.quality_value = QLabel("90%")
-        self.quality_slider.valueChanged.connect(
-            lambda v: self.quality_value.setText(f"{v}%"))
+        self.quality_slider.valueChanged.connect(self._on_quality_changed, Qt.DirectConnection)
             
         quality_layout.addWidget(quality_label)
         quality_layout.addWidget(self.quality_slider)
@@ -261,8 +486,8 @@ class MainWindow(QMainWindow):
         self.status_bar.showMessage("Ready")
         
         # Set up connections
-        self.width_spin.valueChanged.connect(self.update_preview_params)
-        self.height_spin.valueChanged.connect(self.update_preview_params)
+        self.width_spin.valueChanged.connect(self.update_preview_params, Qt.DirectConnection)
+        self.height_spin.valueChanged.connect(self.update_preview_params, Qt.DirectConnection)
         
         # Add menu bar
         self._create_menu_bar()
@@ -319,7 +544,18 @@ class MainWindow(QMainWindow):
         # Recent files submenu
         self.recent_menu = QMenu("Recent Files", self)
         file_menu.addMenu(self.recent_menu)
-        self.update_recent_files_menu()
+        
+        # One reusable action per recent file slot, connected once
+        self._recent_actions = []
+        for i in range(self.max_recent_files):
+            action = QAction(self)
+            action.setVisible(False)
+            action.triggered.connect(lambda checked, i=i: self._open_recent_index(i))
+            self.recent_menu.addAction(action)
+            self._recent_actions.append(action)
+        
+        # Stat the recent files after the window is shown, not while building it
+        QTimer.singleShot(0, self._refresh_recents_stat)
         
         file_menu.addSeparator()
         
@@ -338,9 +574,9 @@ class MainWindow(QMainWindow):
     
     def _setup_shortcuts(self):
         """Set up keyboard shortcuts"""
+        # Open and Save already own Ctrl+O / Ctrl+S through their menu
+        # actions; registering them again here would fire both
         shortcuts = [
-            (QKeySequence.Open, self.open_file),
-            (QKeySequence.Save, self.save_file),
             (Qt.Key_Space, self.toggle_preview),
             ("Ctrl+P", self.generate_preview),
             ("Ctrl+R", self.reset_settings),
@@ -364,14 +600,22 @@ class MainWindow(QMainWindow):
             
         for preset in self.preset_manager.get_presets():
             if preset["name"] == preset_name:
-                self.fps_spin.setValue(preset["fps"])
-                self.quality_slider.setValue(preset["quality"])
-                resolution_index = self.resolution_combo.findText(preset["resolution"])
-                if resolution_index >= 0:
-                    self.resolution_combo.setCurrentIndex(resolution_index)
-                # Apply speed setting if available in the preset
-                if "speed" in preset:
-                    self.speed_slider.setValue(preset["speed"])
+                # Block the per-widget signals so the whole preset triggers a
+                # single recompute instead of one per setValue
+                with QSignalBlocker(self.fps_spin), QSignalBlocker(self.quality_slider), \
+                        QSignalBlocker(self.resolution_combo), QSignalBlocker(self.speed_slider), \
+                        QSignalBlocker(self.width_spin), QSignalBlocker(self.height_spin):
+                    self.fps_spin.setValue(preset["fps"])
+                    self.quality_slider.setValue(preset["quality"])
+                    resolution_index = self.resolution_combo.findText(preset["resolution"])
+                    if resolution_index >= 0:
+                        self.resolution_combo.setCurrentIndex(resolution_index)
+                        self.on_resolution_changed(resolution_index)
+                    # Apply speed setting if available in the preset
+                    if "speed" in preset:
+                        self.speed_slider.setValue(preset["speed"])
+                self._sync_value_labels()
+                self.update_preview_params()
                 break
     
     def save_current_preset(self):
@@ -417,26 +661,105 @@ class MainWindow(QMainWindow):
             self.setStyle(QStyleFactory.create("Fusion"))
             self.setPalette(self.style().standardPalette())
     
+    def _load_recent_files(self):
+        """Load recent files from settings
+        
+        Entries are dicts holding the path and its precomputed basename.
+        Older versions stored plain path strings; those are upgraded once
+        and written back.
+        """
+        stored = self.settings.value("recent_files", []) or []
+        recent_files = []
+        migrated = False
+        for entry in stored:
+            if isinstance(entry, str):
+                entry = {"path": entry}
+                migrated = True
+            if "basename" not in entry:
+                entry["basename"] = os.path.basename(entry["path"])
+                migrated = True
+            recent_files.append(entry)
+        if migrated:
+            self.settings.setValue("recent_files", recent_files)
+        return recent_files
+    
+    def _find_recent(self, file_path):
+        """Return the recent files entry for a path, or None"""
+        for entry in self.recent_files:
+            if entry["path"] == file_path:
+                return entry
+        return None
+    
     def update_recent_files_menu(self):
         """Update the recent files menu"""
-        self.recent_menu.clear()
-        for file_path in self.recent_files:
-            if os.path.exists(file_path):
-                action = QAction(os.path.basename(file_path), self)
-                action.setData(file_path)
-                action.triggered.connect(lambda checked, path=file_path: self.open_recent_file(path))
-                self.recent_menu.addAction(action)
+        existing = [entry for entry in self.recent_files if self._cached_exists(entry)]
+        for i, action in enumerate(self._recent_actions):
+            if i < len(existing):
+                action.setText(existing[i]["basename"])
+                action.setData(existing[i]["path"])
+                action.setVisible(True)
+            else:
+                action.setVisible(False)
+    
+    def _cached_exists(self, entry):
+        """os.path.exists for a recent files entry, cached on the entry for two seconds
+        
+        Stale entries on disconnected network drives can block for seconds,
+        so recent menu refreshes should not stat every path every time.
+        """
+        now = time.monotonic()
+        checked_at = entry.get("checked_at")
+        if checked_at is not None and now - checked_at < 2.0:
+            return entry["exists"]
+        entry["exists"] = os.path.exists(entry["path"])
+        entry["checked_at"] = now
+        return entry["exists"]
+    
+    def _refresh_recents_stat(self):
+        """Check which recent files still exist and rebuild the menu"""
+        for entry in self.recent_files:
+            entry.pop("checked_at", None)
+        self.update_recent_files_menu()
+    
+    def _open_recent_index(self, index):
+        """Open the file shown in the given recent files slot"""
+        file_path = self._recent_actions[index].data()
+        if file_path:
+            self.open_recent_file(file_path)
     
     def add_recent_file(self, file_path):
         """Add a file to recent files list"""
-        if file_path in self.recent_files:
-            self.recent_files.remove(file_path)
-        self.recent_files.insert(0, file_path)
+        entry = self._find_recent(file_path)
+        if entry is not None:
+            self.recent_files.remove(entry)
+        else:
+            entry = {"path": file_path, "basename": os.path.basename(file_path)}
+        self.recent_files.insert(0, entry)
+        # The file was just opened, so it exists
+        entry["exists"] = True
+        entry["checked_at"] = time.monotonic()
         while len(self.recent_files) > self.max_recent_files:
             self.recent_files.pop()
-        self.settings.setValue("recent_files", self.recent_files)
+        self._schedule_recent_files_flush()
         self.update_recent_files_menu()
     
+    def _schedule_recent_files_flush(self):
+        """Persist the recent files list once the current burst of changes is done"""
+        if self._recent_files_dirty:
+            return
+        self._recent_files_dirty = True
+        QTimer.singleShot(0, self._flush_recent_files)
+    
+    def _flush_recent_files(self):
+        """Write the recent files list to settings if it changed"""
+        if not self._recent_files_dirty:
+            return
+        self._recent_files_dirty = False
+        # The existence cache is only meaningful for this session
+        self.settings.setValue("recent_files",
+                               [{"path": e["path"], "basename": e["basename"]}
+                                for e in self.recent_files])
+    
     def open_recent_file(self, file_path):
         """Open a file from the recent files menu"""
         if os.path.exists(file_path):
@@ -444,8 +767,10 @@ class MainWindow(QMainWindow):
         else:
             QMessageBox.warning(self, "File Not Found", 
                               f"The file {file_path} no longer exists.")
-            self.recent_files.remove(file_path)
-            self.settings.setValue("recent_files", self.recent_files)
+            entry = self._find_recent(file_path)
+            if entry is not None:
+                self.recent_files.remove(entry)
+            self._schedule_recent_files_flush()
             self.update_recent_files_menu()
     
     def load_video_file(self, file_path):
@@ -453,6 +778,8 @@ class MainWindow(QMainWindow):
         self.current_file = file_path
         try:
             self.status_bar.showMessage(f"Loading video: {os.path.basename(file_path)}")
+            self._stop_thumbnail_worker()
+            self._cancel_preview()
             result = self.video_processor.load_video(file_path)
             
             if result:
@@ -460,13 +787,17 @@ class MainWindow(QMainWindow):
                 self.fps_spin.setValue(int(self.video_processor.fps))
                 self.save_button.setEnabled(True)
                 self.save_action.setEnabled(True)
-                self.preview_button.setEnabled(True)
+                # A cancelled preview re-enables it once its thread finishes
+                self.preview_button.setEnabled(self._preview_thread is None)
                 
-                # Setup timeline
+                # Setup timeline; thumbnails fill in as the worker decodes them
                 self.timeline_widget.setup_timeline(
                     self.video_processor.duration,
-                    self.video_processor.get_thumbnails()
+                    thumbnail_count=len(self.video_processor.get_thumbnail_positions())
                 )
+                self._thumbnail_worker = ThumbnailWorker(self.video_processor, self)
+                self._thumbnail_worker.thumbnail_ready.connect(self.timeline_widget.add_thumbnail)
+                self._thumbnail_worker.start()
                 
                 # Show first frame
                 first_frame = self.video_processor.get_frame(0)
@@ -494,6 +825,22 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Error", 
                 f"An error occurred while loading the video: {str(e)}")
     
+    def _cancel_preview(self):
+        """Stop a running preview and make sure its result is ignored"""
+        self.preview_widget.stop_stream()
+        if self._preview_worker is not None:
+            self._preview_worker.cancel()
+        self._load_generation += 1
+    
+    def _stop_thumbnail_worker(self):
+        """Stop a running thumbnail worker before the video it reads changes"""
+        if self._thumbnail_worker is None:
+            return
+        self._thumbnail_worker.requestInterruption()
+        self._thumbnail_worker.wait()
+        self._thumbnail_worker.thumbnail_ready.disconnect()
+        self._thumbnail_worker = None
+    
     def open_file(self):
         """Open a video file"""
         file_dialog = QFileDialog(self)
@@ -506,31 +853,30 @@ class MainWindow(QMainWindow):
             self.load_video_file(file_path)
     
     def update_size_estimate(self):
+        """Schedule an update of the estimated output file size"""
+        # Restarting the timer resets the countdown so only the last call runs
+        self._size_estimate_timer.start()
+
+    def _do_update_size_estimate(self):
         """Update the estimated output file size"""
         if not self.current_file:
             self.size_label.setText("Estimated size: -")
             return
             
         try:
-            # Get current settings
-            fps = self.fps_spin.value()
-            width = self.width_spin.value()
-            height = self.height_spin.value()
-            quality = self.quality_slider.value() / 100.0
-            speed_factor = self.speed_slider.value() / 100.0  # Get speed factor
+            # Get current settings as ints so repeated slider positions hit the cache
             start_time, end_time = self.timeline_widget.get_trim_values()
-            duration = end_time - start_time
+            # Trimmed-out segments don't end up in the GIF
+            duration = (end_time - start_time) - _excluded_duration(
+                self._excluded_array, start_time, end_time)
+            duration_ms = int(duration * 1000)
             
-            # Estimate size based on resolution, duration, fps, and quality
-            pixels_per_frame = width * height
-            
-            # Adjust number of frames based on speed factor
-            # Higher speed = fewer frames
-            frames = int(duration * fps / speed_factor)
-            
-            bytes_per_pixel = 3 * quality  # Rough estimate, 3 bytes per pixel at max quality
-            
-            estimated_size = (pixels_per_frame * frames * bytes_per_pixel) / (1024 * 1024)  # Convert to MB
+            estimated_size = _estimate_mb(self.fps_spin.value(),
+                                          self.width_spin.value(),
+                                          self.height_spin.value(),
+                                          self.quality_slider.value(),
+                                          self.speed_slider.value(),
+                                          duration_ms)
             
             self.size_label.setText(f"Estimated size: {estimated_size:.1f} MB")
         except Exception as e:
@@ -542,7 +888,7 @@ class MainWindow(QMainWindow):
             return
             
         # First check if we have preview frames to use
-        if not hasattr(self.preview_widget, 'preview_frames') or not self.preview_widget.preview_frames:
+        if not hasattr(self.preview_widget, 'preview_frames') or len(self.preview_widget.preview_frames) == 0:
             # No preview frames available, prompt the user to generate a preview first
             QMessageBox.information(self, "No Preview", 
                                    "Please generate a preview first so we can save exactly what you see.")
@@ -565,56 +911,86 @@ class MainWindow(QMainWindow):
                 quality = self.quality_slider.value() / 100.0
                 loop = self.loop_checkbox.isChecked()
                 
+                # Use the loop parameter
+                loop_param = 0 if loop else 1
+                
                 # Create progress dialog
                 progress = QProgressDialog("Creating GIF...", "Cancel", 0, 100, self)
                 progress.setWindowModality(Qt.WindowModal)
                 progress.setWindowTitle("Saving GIF")
                 progress.setMinimumDuration(0)
                 progress.setValue(10)  # Start progress at 10%
+                self._save_progress = progress
                 
                 # Show status update
                 self.status_bar.showMessage("Saving GIF from preview frames...")
-                QApplication.processEvents()
                 
-                try:
-                    # Save the GIF directly from the preview frames
-                    import imageio
-                    
-                    # Use the loop parameter 
-                    loop_param = 0 if loop else 1
-                    
-                    progress.setValue(50)  # Update progress
-                    
-                    # Save the GIF with the current settings
-                    imageio.mimsave(output_path, frames, fps=fps, 
-                                   quantizer=int(100-quality*100), 
-                                   loop=loop_param)
-                    
-                    progress.setValue(100)  # Complete progress
-                    progress.close()
-                    
-                    # Show success message
-                    QMessageBox.information(self, "Success", 
-                                          f"GIF saved successfully to:\n{output_path}\n\nExactly as shown in the preview.")
-                    
-                    self.status_bar.showMessage(f"GIF saved to: {output_path}")
+                # Encode on a worker thread, reusing the palette and indices
+                # computed for the preview when present
+                worker = GifSaveWorker(output_path, frames, fps, quality, loop_param,
+                                       self.preview_widget.preview_palette,
+                                       self.preview_widget.preview_indices)
+                thread = QThread(self)
+                worker.moveToThread(thread)
+                thread.started.connect(worker.run)
+                worker.progress.connect(progress.setValue)
+                worker.done.connect(self._on_gif_saved)
+                worker.error.connect(self._on_gif_save_error)
+                worker.cancelled.connect(self._on_gif_save_cancelled)
+                for signal in (worker.done, worker.error, worker.cancelled):
+                    signal.connect(thread.quit)
+                thread.finished.connect(worker.deleteLater)
+                thread.finished.connect(thread.deleteLater)
+                # The worker is busy in run(), so the flag must be set directly
+                progress.canceled.connect(worker.cancel, Qt.DirectConnection)
                 
-                except Exception as e:
-                    progress.close()
-                    QMessageBox.critical(self, "Error", 
-                                       f"Failed to save GIF: {str(e)}")
+                self._save_thread = thread
+                self._save_worker = worker
+                self.save_button.setEnabled(False)
+                self.save_action.setEnabled(False)
+                thread.start()
                 
             except Exception as e:
-                QMessageBox.critical(self, "Error", 
+                QMessageBox.critical(self, "Error",
                                    f"An error occurred while saving the GIF: {str(e)}")
     
+    def _finish_save(self):
+        """Close the progress dialog and re-enable saving"""
+        if self._save_progress is not None:
+            self._save_progress.close()
+            self._save_progress = None
+        self._save_thread = None
+        self._save_worker = None
+        self.save_button.setEnabled(True)
+        self.save_action.setEnabled(True)
+    
+    def _on_gif_saved(self, output_path):
+        """Handle a finished GIF save"""
+        self._finish_save()
+        
+        # Show success message
+        QMessageBox.information(self, "Success", 
+                              f"GIF saved successfully to:\n{output_path}\n\nExactly as shown in the preview.")
+        
+        self.status_bar.showMessage(f"GIF saved to: {output_path}")
+    
+    def _on_gif_save_error(self, message):
+        """Handle a failed GIF save"""
+        self._finish_save()
+        QMessageBox.critical(self, "Error", 
+                           f"Failed to save GIF: {message}")
+    
+    def _on_gif_save_cancelled(self):
+        """Handle a cancelled GIF save"""
+        self._finish_save()
+        self.status_bar.showMessage("Saving GIF cancelled")
+    
     def toggle_preview(self):
         """Toggle preview playback"""
-        if hasattr(self.preview_widget, 'preview_timer'):
-            if self.preview_widget.preview_timer.isActive():
-                self.preview_widget.preview_timer.stop()
-            else:
-                self.generate_preview()
+        if self.preview_widget.is_playing():
+            self.preview_widget.stop_playback()
+        else:
+            self.generate_preview()
     
     def reset_settings(self):
         """Reset all settings to defaults"""
@@ -622,26 +998,64 @@ class MainWindow(QMainWindow):
             "Are you sure you want to reset all settings to defaults?",
             QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
             
-            self.fps_spin.setValue(15)
-            self.quality_slider.setValue(90)
-            self.resolution_combo.setCurrentText("Original")
+            # Block the per-widget signals so the reset triggers a single
+            # recompute instead of one per setValue
+            with QSignalBlocker(self.fps_spin), QSignalBlocker(self.quality_slider), \
+                    QSignalBlocker(self.resolution_combo), QSignalBlocker(self.speed_slider), \
+                    QSignalBlocker(self.width_spin), QSignalBlocker(self.height_spin):
+                self.fps_spin.setValue(15)
+                self.quality_slider.setValue(90)
+                self.resolution_combo.setCurrentText("Original")
+                self.on_resolution_changed(self.resolution_combo.currentIndex())
+                self.speed_slider.setValue(100)  # Reset speed to normal (1.0x)
+                
+                if self.current_file:
+                    width, height = self.video_processor.get_dimensions()
+                    self.width_spin.setValue(width)
+                    self.height_spin.setValue(height)
             self.maintain_aspect.setChecked(True)
             self.enable_crop.setChecked(False)
-            self.speed_slider.setValue(100)  # Reset speed to normal (1.0x)
-            
-            if self.current_file:
-                width, height = self.video_processor.get_dimensions()
-                self.width_spin.setValue(width)
-                self.height_spin.setValue(height)
+            self._sync_value_labels()
+            self.update_preview_params()
     
     def closeEvent(self, event):
         """Handle application close event"""
         # Save window geometry
         self.settings.setValue("geometry", self.saveGeometry())
+        self._flush_recent_files()
+        self._stop_thumbnail_worker()
+        # A preview worker blocked feeding the stream is only drained by the
+        # UI timer, which cannot run while this thread waits for it
+        self._cancel_preview()
+        for thread in (self._preview_thread, self._save_thread):
+            if thread is not None:
+                # Let in-flight work finish before the window goes away
+                thread.quit()
+                thread.wait()
+        # Free the capture now rather than whenever the processor is collected
+        self.video_processor.close()
         super().closeEvent(event)
 
     def on_trim_changed(self, start_time, end_time):
         """Handle timeline trim changes"""
+        # Remember the latest position; the timer seeks to it at most every 166 ms
+        self._pending_trim = (start_time, end_time)
+        if not self._trim_seek_timer.isActive():
+            self._trim_seek_timer.start()
+
+    def on_trim_released(self, start_time, end_time):
+        """Show the exact frame once a trim handle is released"""
+        self._trim_seek_timer.stop()
+        self._pending_trim = (start_time, end_time)
+        self._apply_pending_trim()
+
+    def _apply_pending_trim(self):
+        """Seek to the most recent trim position and show its frame"""
+        if self._pending_trim is None:
+            return
+
+        start_time, end_time = self._pending_trim
+        self._pending_trim = None
         if hasattr(self, 'video_processor') and self.video_processor.is_loaded():
             # Update preview frame
             frame_pos = start_time
@@ -649,12 +1063,35 @@ class MainWindow(QMainWindow):
             if frame is not None:
                 self.preview_widget.display_frame(frame)
     
+    def _on_speed_changed(self, value):
+        """Update the speed label and schedule a preview/estimate refresh"""
+        self.speed_value.setText(f"{value/100:.1f}x")
+        self.update_preview_params()
+    
+    def _on_quality_changed(self, value):
+        """Update the quality label and schedule a preview/estimate refresh"""
+        self.quality_value.setText(f"{value}%")
+        self.update_preview_params()
+    
+    def _sync_value_labels(self):
+        """Refresh the speed and quality labels after signal-blocked updates"""
+        self.speed_value.setText(f"{self.speed_slider.value()/100:.1f}x")
+        self.quality_value.setText(f"{self.quality_slider.value()}%")
+    
     def update_preview_params(self):
         """Update preview parameters when controls change"""
+        if hasattr(self, 'preview_widget'):
+            # Cached palette/indices no longer match the current settings
+            self.preview_widget.clear_quantization()
+        self._params_generation += 1
+        self._preview_params_timer.start()
+
+    def _do_update_preview_params(self):
+        """Apply the preview parameter changes once the controls settle"""
         if hasattr(self, 'preview_button'):
-            self.preview_button.setEnabled(self.current_file is not None)
+            self.preview_button.setEnabled(self.current_file is not None and self._preview_thread is None)
             # Update the file size estimate when parameters change
-            self.update_size_estimate()
+            self._do_update_size_estimate()
     
     def on_resolution_changed(self, index):
         """Handle resolution dropdown changes"""
@@ -697,7 +1134,9 @@ class MainWindow(QMainWindow):
     
     def generate_preview(self):
         """Generate a preview GIF with current settings"""
-        if not self.current_file:
+        # One background job at a time; a running save keeps its own
+        # reference to the frames it encodes
+        if not self.current_file or self._preview_thread is not None or self._save_thread is not None:
             return
             
         try:
@@ -713,50 +1152,93 @@ class MainWindow(QMainWindow):
             if self.enable_crop.isChecked() and hasattr(self.preview_widget, 'crop_rect'):
                 crop_rect = self.preview_widget.crop_rect
             
-            # Generate and show preview
-            self.status_bar.showMessage("Generating preview...")
-            QApplication.processEvents()
+            params = {
+                "start_time": start_time,
+                "end_time": end_time,
+                "fps": fps,
+                "dimensions": (width, height),
+                "quality": quality,
+                "crop_rect": crop_rect,
+                "speed_factor": speed_factor,
+            }
             
             # Check if we have excluded segments to use
             if self.excluded_segments:
                 # Get the effective segments (segments we want to keep)
                 effective_segments = self.timeline_widget.get_effective_segments()
-                
-                if effective_segments:
-                    # Generate preview using effective segments
-                    preview_frames, adjusted_fps = self.video_processor.generate_preview(
-                        start_time, end_time, fps, (width, height), quality, crop_rect,
-                        segments=effective_segments,
-                        speed_factor=speed_factor
-                    )
-                    
-                    if preview_frames:
-                        # Use the adjusted FPS that accounts for speed factor
-                        self.preview_widget.play_preview(preview_frames, adjusted_fps)
-                        self.status_bar.showMessage(f"Preview generated with trimmed segments (Speed: {speed_factor:.1f}x)")
-                    else:
-                        self.status_bar.showMessage("Failed to generate preview")
-                else:
+                if not effective_segments:
                     self.status_bar.showMessage("No valid segments remain after trimming")
+                    return
+                params["segments"] = effective_segments
+                self._preview_message = f"Preview generated with trimmed segments (Speed: {speed_factor:.1f}x)"
             else:
-                # Standard preview without excluded segments
-                preview_frames, adjusted_fps = self.video_processor.generate_preview(
-                    start_time, end_time, fps, (width, height), quality, crop_rect,
-                    speed_factor=speed_factor
-                )
-                
-                if preview_frames:
-                    # Use the adjusted FPS that accounts for speed factor
-                    self.preview_widget.play_preview(preview_frames, adjusted_fps)
-                    self.status_bar.showMessage(f"Preview generated successfully (Speed: {speed_factor:.1f}x)")
-                else:
-                    self.status_bar.showMessage("Failed to generate preview")
+                self._preview_message = f"Preview generated successfully (Speed: {speed_factor:.1f}x)"
+            
+            # Generate the preview on a worker thread
+            self.status_bar.showMessage("Generating preview...")
+            # Start playback as soon as the first frames are decoded
+            stream = self.preview_widget.begin_stream(fps * speed_factor)
+            worker = PreviewWorker(self.video_processor, params, stream)
+            self._preview_generation = self._params_generation
+            self._preview_load_generation = self._load_generation
+            thread = QThread(self)
+            worker.moveToThread(thread)
+            thread.started.connect(worker.run)
+            worker.progress.connect(self._on_preview_progress)
+            worker.done.connect(self._on_preview_ready)
+            worker.error.connect(self._on_preview_error)
+            for signal in (worker.done, worker.error):
+                signal.connect(thread.quit)
+            thread.finished.connect(worker.deleteLater)
+            thread.finished.connect(thread.deleteLater)
+            
+            self._preview_thread = thread
+            self._preview_worker = worker
+            self.preview_button.setEnabled(False)
+            thread.start()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"An error occurred while generating the preview: {str(e)}")
 
+    def _finish_preview(self):
+        """Forget the preview worker and allow a new preview"""
+        self._preview_thread = None
+        self._preview_worker = None
+        self.preview_button.setEnabled(self.current_file is not None)
+
+    def _on_preview_progress(self, percent):
+        """Show preview generation progress in the status bar"""
+        self.status_bar.showMessage(f"Generating preview... {percent}%")
+
+    def _on_preview_ready(self, preview_frames, adjusted_fps, palette, indices, movie_data):
+        """Play a finished preview"""
+        self._finish_preview()
+        if self._preview_load_generation != self._load_generation:
+            # Preview of a video that has since been replaced or closed
+            return
+        if len(preview_frames):
+            # Use the adjusted FPS that accounts for speed factor
+            self.preview_widget.play_preview(preview_frames, adjusted_fps, movie_data)
+            # A palette built for settings changed while decoding must not be
+            # reused by a save
+            if palette is not None and self._preview_generation == self._params_generation:
+                self.preview_widget.set_quantization(palette, indices)
+            self.status_bar.showMessage(self._preview_message)
+        else:
+            self.preview_widget.stop_stream()
+            self.status_bar.showMessage("Failed to generate preview")
+
+    def _on_preview_error(self, message):
+        """Handle a failed preview"""
+        self._finish_preview()
+        if self._preview_load_generation != self._load_generation:
+            return
+        self.preview_widget.stop_stream()
+        QMessageBox.critical(self, "Error", f"An error occurred while generating the preview: {message}")
+
     def on_segments_changed(self, segments):
         """Handle changes to excluded segments"""
         self.excluded_segments = segments
+        self._excluded_array = np.asarray(segments, dtype=np.float64).reshape(-1, 2)
         
         # Update duration calculation and file size estimate
         self.update_size_estimate()
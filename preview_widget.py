@@ -5,10 +5,72 @@
 Preview widget for displaying video frames and handling crop functionality
 """
 
+import queue
+import threading
+
+import cv2
 import numpy as np
 from PyQt5.QtWidgets import QWidget, QLabel, QVBoxLayout, QSizePolicy
-from PyQt5.QtGui import QImage, QPixmap, QPainter, QPen, QColor
-from PyQt5.QtCore import Qt, QRect, QTimer, pyqtSignal, QPoint, QSize
+from PyQt5.QtGui import QImage, QPixmap, QPainter, QPen, QColor, QMovie
+from PyQt5.QtCore import Qt, QRect, QTimer, pyqtSignal, QPoint, QSize, QBuffer, QByteArray
+
+class FrameStream:
+    """Bounded hand-off of preview frames from a decoding thread to the widget"""
+    
+    def __init__(self, maxsize=16):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.stopped = threading.Event()
+    
+    def put(self, frame):
+        """Queue a frame, waiting while the widget catches up
+        
+        Returns:
+            False once the widget stopped reading, True otherwise
+        """
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(frame, timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def stop(self):
+        """Stop accepting frames and release a waiting producer"""
+        self.stopped.set()
+
+class CropOverlay(QWidget):
+    """Transparent layer over the frame label that draws the crop rectangle"""
+    
+    # Pen shared by every repaint
+    CROP_PEN = QPen(QColor(255, 0, 0), 2)
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.crop_rect = None
+    
+    def set_rect(self, rect):
+        """Move the rectangle, repainting only the areas it leaves and enters"""
+        if rect == self.crop_rect:
+            return
+        for old_or_new in (self.crop_rect, rect):
+            if old_or_new is not None:
+                # Pad by the pen width so the edges are cleared too
+                pad = self.CROP_PEN.width()
+                self.update(old_or_new.adjusted(-pad, -pad, pad, pad))
+        self.crop_rect = rect
+    
+    def paintEvent(self, event):
+        """Paint the crop rectangle"""
+        if self.crop_rect is None:
+            return
+        painter = QPainter(self)
+        try:
+            painter.setPen(self.CROP_PEN)
+            painter.drawRect(self.crop_rect)
+        finally:
+            painter.end()
 
 class PreviewWidget(QWidget):
     """Widget for displaying video frames and previews with crop functionality"""
@@ -17,15 +79,40 @@ class PreviewWidget(QWidget):
         super().__init__(parent)
         
         self.current_pixmap = None
+        # Last frame shown, kept at full resolution; current_pixmap holds it
+        # pre-scaled to the label size and is only rebuilt when either changes
+        self._source = None
+        self._scaled_size = None
         self.preview_frames = []
+        # Preview frames pre-scaled to _pixmaps_size, built on the first tick
+        # after play_preview or a resize
+        self._scaled_pixmaps = None
+        self._pixmaps_size = None
+        # Palette and (N, H, W) index arrays for preview_frames, reused when saving
+        self.preview_palette = None
+        self.preview_indices = None
         self.current_preview_index = 0
+        # Frames of a preview that is still being decoded, and how many of
+        # them have been shown
+        self._stream = None
+        self._streamed_count = 0
+        # (label size, pixmap) of each streamed frame shown so far, handed to
+        # play_preview so finished previews don't rescale them a second time
+        self._streamed_pixmaps = []
         self.preview_timer = QTimer()
         self.preview_timer.timeout.connect(self.show_next_preview_frame)
+        self._preview_interval = 0
+        # Finished previews encoded as a GIF are played by QMovie inside Qt;
+        # the timer path above is kept for crop mode and streaming
+        self._movie = None
+        self._movie_buffer = None
         
         self.crop_mode = False
         self.crop_start = None
         self.crop_end = None
         self.crop_rect = None
+        # Set while a coalesced crop redraw is scheduled
+        self._crop_repaint_pending = False
         
         # Create display label
         self.frame_label = QLabel()
@@ -34,6 +121,11 @@ class PreviewWidget(QWidget):
         self.frame_label.setMinimumSize(320, 240)
         self.frame_label.setStyleSheet("background-color: black;")
         
+        # Crop selection is drawn on a transparent child of the label, so a
+        # drag repaints the rectangle instead of the whole frame
+        self.crop_overlay = CropOverlay(self.frame_label)
+        self._label_pixmap_key = None
+        
         # Set up layout
         layout = QVBoxLayout()
         layout.addWidget(self.frame_label)
@@ -47,69 +139,269 @@ class PreviewWidget(QWidget):
             
         # Stop any preview playback
         self.preview_timer.stop()
+        self.stop_stream()
+        self._stop_movie()
         
-        # Convert numpy array to QImage
-        height, width, channel = frame.shape
-        bytes_per_line = channel * width
-        q_img = QImage(frame.data, width, height, bytes_per_line, QImage.Format_RGB888)
-        
-        # Create a pixmap and display it
-        self.current_pixmap = QPixmap.fromImage(q_img)
-        self._update_display()
+        self._set_source(frame)
+        self._update_display_static()
     
-    def play_preview(self, frames, fps):
-        """Play a preview with the given frames and fps"""
-        if not frames:
+    def play_preview(self, frames, fps, movie_data=None):
+        """Play a preview with the given frames and fps
+        
+        frames is an (N, H, W, 3) uint8 array, used as it is without a copy.
+        movie_data optionally holds the same frames encoded as a GIF, which is
+        then played with QMovie unless crop mode needs the per-frame redraw.
+        """
+        if len(frames) == 0:
             return
             
-        self.preview_frames = frames
-        self.current_preview_index = 0
-        
+        # Carry on from where a streamed preview of these frames got to
+        start_index = self._streamed_count % len(frames) if self._stream is not None else 0
+        streamed = self._streamed_pixmaps if self._stream is not None else []
+        self.stop_stream()
+        self._stop_movie()
+            
+        # Each preview gets an array of its own rather than overwriting the
+        # last one, which a running save may still be encoding
+        self.preview_frames = np.asarray(frames, dtype=np.uint8)
+        self.clear_quantization()
+        self.current_preview_index = start_index
+
         # Calculate interval (in ms) based on fps
-        interval = int(1000 / fps)
-        self.preview_timer.start(interval)
+        self._preview_interval = int(1000 / fps)
+        if movie_data is not None and not self.crop_mode and self._start_movie(movie_data, start_index):
+            self.preview_timer.stop()
+            # Pixmaps are only built if playback falls back to the timer
+            self._scaled_pixmaps = None
+            return
+            
+        self._build_preview_pixmaps(streamed)
+        self.preview_timer.start(self._preview_interval)
+    
+    def _start_movie(self, data, start_index=0):
+        """Play GIF bytes with QMovie, returning False if Qt cannot read them"""
+        buffer = QBuffer(self)
+        buffer.setData(QByteArray(data))
+        buffer.open(QBuffer.ReadOnly)
+        movie = QMovie(buffer, b"gif", self)
+        if not movie.isValid():
+            print("Could not play preview as a movie, falling back to the timer")
+            movie.deleteLater()
+            buffer.deleteLater()
+            return False
+            
+        movie.setCacheMode(QMovie.CacheAll)
+        height, width = self.preview_frames.shape[1:3]
+        movie.setScaledSize(self._fit_size(width, height, self.frame_label.size()))
+        self._movie = movie
+        self._movie_buffer = buffer
+        self._label_pixmap_key = None
+        self.frame_label.setMovie(movie)
+        movie.start()
+        if start_index:
+            movie.jumpToFrame(start_index)
+        return True
+    
+    def _stop_movie(self):
+        """Stop QMovie playback and clear it from the label"""
+        if self._movie is None:
+            return
+        self._movie.stop()
+        self.frame_label.clear()
+        self._movie.deleteLater()
+        self._movie_buffer.deleteLater()
+        self._movie = None
+        self._movie_buffer = None
+        self._label_pixmap_key = None
+    
+    def _movie_to_timer(self):
+        """Continue QMovie playback on the timer from the frame it is showing"""
+        running = self._movie.state() == QMovie.Running
+        self.current_preview_index = max(0, self._movie.currentFrameNumber()) % len(self.preview_frames)
+        self._stop_movie()
+        self.show_next_preview_frame()
+        if running:
+            self.preview_timer.start(self._preview_interval)
+    
+    def is_playing(self):
+        """Return whether a preview is playing"""
+        if self._movie is not None:
+            return self._movie.state() == QMovie.Running
+        return self.preview_timer.isActive()
     
+    def stop_playback(self):
+        """Pause preview playback on the frame being shown"""
+        self.preview_timer.stop()
+        if self._movie is not None:
+            self._movie.setPaused(True)
+    
+    def begin_stream(self, fps):
+        """Start playing frames as a decoding thread produces them
+        
+        Returns the FrameStream to feed; play_preview with the complete
+        frames takes over once decoding is done.
+        """
+        self.stop_stream()
+        self.preview_timer.stop()
+        self._stop_movie()
+        self.preview_frames = []
+        self.clear_quantization()
+        self._stream = FrameStream()
+        self._streamed_count = 0
+        self.preview_timer.start(int(1000 / fps))
+        return self._stream
+    
+    def stop_stream(self):
+        """Stop reading from a running stream"""
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream = None
+        self._streamed_pixmaps = []
+    
+    def _show_next_streamed_frame(self):
+        """Show the next decoded frame, or keep the current one if none is ready"""
+        try:
+            frame = self._stream.queue.get_nowait()
+        except queue.Empty:
+            # Decoding is behind playback; skip this tick rather than wait
+            return
+            
+        self._set_source(frame)
+        self._streamed_pixmaps.append((self._scaled_size, self.current_pixmap))
+        self._update_display_playback()
+        self._streamed_count += 1
+    
+    def set_quantization(self, palette, indices):
+        """Store the palette and index arrays computed for the current preview"""
+        self.preview_palette = palette
+        self.preview_indices = indices
+
+    def clear_quantization(self):
+        """Drop the cached palette and index arrays"""
+        self.preview_palette = None
+        self.preview_indices = None
+
     def show_next_preview_frame(self):
         """Show the next frame in the preview sequence"""
-        if not self.preview_frames:
+        if self._stream is not None:
+            self._show_next_streamed_frame()
+            return
+            
+        if len(self.preview_frames) == 0:
             self.preview_timer.stop()
             return
             
-        frame = self.preview_frames[self.current_preview_index]
-        
-        # Convert numpy array to QImage
-        height, width, channel = frame.shape
-        bytes_per_line = channel * width
-        q_img = QImage(frame.data, width, height, bytes_per_line, QImage.Format_RGB888)
-        
-        # Create a pixmap and display it
-        self.current_pixmap = QPixmap.fromImage(q_img)
-        self._update_display()
+        # The pixmap is already scaled, so a tick is just a pixmap swap
+        self._source = self.preview_frames[self.current_preview_index]
+        self.current_pixmap = self._playback_pixmap(self.current_preview_index)
+        self._scaled_size = self._pixmaps_size
+        self._update_display_playback()
         
         # Move to next frame or loop back to beginning
         self.current_preview_index = (self.current_preview_index + 1) % len(self.preview_frames)
     
-    def _update_display(self):
+    def _build_preview_pixmaps(self, reuse=()):
+        """Scale every preview frame to the label size once
+        
+        reuse holds (label size, pixmap) pairs for the leading frames that are
+        already scaled; those taken at the current size are kept as they are.
+        """
+        label_size = self.frame_label.size()
+        self._scaled_pixmaps = [reuse[i][1] if i < len(reuse) and reuse[i][0] == label_size
+                                else self._scaled_pixmap(frame, label_size)
+                                for i, frame in enumerate(self.preview_frames)]
+        self._pixmaps_size = label_size
+    
+    def _playback_pixmap(self, index):
+        """Return the scaled pixmap for a preview frame, rescaling it if the label changed size"""
+        label_size = self.frame_label.size()
+        if self._scaled_pixmaps is None or self._pixmaps_size != label_size:
+            # Refill lazily so each tick only rescales the frame it shows
+            self._scaled_pixmaps = [None] * len(self.preview_frames)
+            self._pixmaps_size = label_size
+            
+        pixmap = self._scaled_pixmaps[index]
+        if pixmap is None:
+            pixmap = self._scaled_pixmap(self.preview_frames[index], label_size)
+            self._scaled_pixmaps[index] = pixmap
+        return pixmap
+    
+    def _set_source(self, frame):
+        """Make frame the source of the display and drop the old scaled copy"""
+        self._source = frame
+        self._scaled_size = None
+        self._rescale_cached()
+    
+    def _rescale_cached(self):
+        """Scale the source frame to fit the label, unless it already fits this size"""
+        if self._source is None:
+            return
+            
+        label_size = self.frame_label.size()
+        if self._scaled_size == label_size:
+            return
+            
+        self.current_pixmap = self._scaled_pixmap(self._source, label_size)
+        self._scaled_size = label_size
+    
+    def _fit_size(self, width, height, label_size):
+        """Return the size width x height scales to when fitted into label_size, keeping the aspect ratio"""
+        scale = min(label_size.width() / width, label_size.height() / height)
+        return QSize(max(1, int(width * scale)), max(1, int(height * scale)))
+    
+    def _scaled_pixmap(self, frame, label_size):
+        """Return frame as a pixmap scaled to fit label_size, keeping the aspect ratio"""
+        height, width = frame.shape[:2]
+        target_size = self._fit_size(width, height, label_size)
+        target_width, target_height = target_size.width(), target_size.height()
+        
+        if (target_width, target_height) != (width, height):
+            # INTER_AREA averages source pixels when shrinking, which is
+            # fast and alias-free; bilinear is enough when enlarging
+            shrinking = target_width < width or target_height < height
+            interpolation = cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR
+            frame = cv2.resize(frame, (target_width, target_height),
+                               interpolation=interpolation)
+        # Pack into BGRX (opaque alpha) directly in a Qt-owned RGB32 image:
+        # rows are 4-byte aligned and it is the native pixmap format, so
+        # fromImage shares the data instead of repacking 24-bit rows. The
+        # image must own its memory since the pixmap keeps referencing it
+        q_img = QImage(target_width, target_height, QImage.Format_RGB32)
+        bits = q_img.bits()
+        bits.setsize(q_img.byteCount())
+        bgrx = np.frombuffer(bits, np.uint8).reshape(target_height, target_width, 4)
+        cv2.cvtColor(frame, cv2.COLOR_RGB2BGRA, dst=bgrx)
+        return QPixmap.fromImage(q_img)
+    
+    def _update_display_playback(self):
+        """Show the current playback pixmap; only crop mode needs the full redraw"""
+        if self.crop_mode:
+            self._update_display_static()
+        else:
+            self._show_pixmap(self.current_pixmap)
+    
+    def _update_display_static(self):
         """Update the display with the current pixmap, considering crop mode"""
         if self.current_pixmap is None:
             return
             
-        # Create a scaled version of the pixmap
+        # The pixmap is already scaled to the label size
         label_size = self.frame_label.size()
-        scaled_pixmap = self.current_pixmap.scaled(
-            label_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        scaled_pixmap = self.current_pixmap
         
         # If not in crop mode, just show the scaled pixmap
         if not self.crop_mode:
-            self.frame_label.setPixmap(scaled_pixmap)
+            self.crop_overlay.set_rect(None)
+            self._show_pixmap(scaled_pixmap)
             return
             
-        # In crop mode, work with a copy of the scaled pixmap
-        display_pixmap = scaled_pixmap.copy()
+        # The background only changes with the frame or the label size; crop
+        # drags just move the overlay on top of it
+        self._show_pixmap(scaled_pixmap)
         
         # Calculate scaling factors between original and displayed image
-        scale_x = self.current_pixmap.width() / scaled_pixmap.width()
-        scale_y = self.current_pixmap.height() / scaled_pixmap.height()
+        scale_x = self._source.shape[1] / scaled_pixmap.width()
+        scale_y = self._source.shape[0] / scaled_pixmap.height()
         
         # Calculate offsets for centered image
         x_offset = (label_size.width() - scaled_pixmap.width()) / 2
@@ -117,50 +409,28 @@ class PreviewWidget(QWidget):
         
         # If we have a crop rectangle, draw it
         if self.crop_start is not None and self.crop_end is not None:
-            try:
-                painter = QPainter()
-                if painter.begin(display_pixmap):
-                    try:
-                        # Set up the pen for drawing
-                        pen = QPen(QColor(255, 0, 0))
-                        pen.setWidth(2)
-                        painter.setPen(pen)
-                        
-                        # Convert crop coordinates
-                        start_x = self.crop_start.x() - x_offset
-                        start_y = self.crop_start.y() - y_offset
-                        end_x = self.crop_end.x() - x_offset
-                        end_y = self.crop_end.y() - y_offset
-                        
-                        # Ensure coordinates are within bounds
-                        start_x = max(0, min(start_x, scaled_pixmap.width()))
-                        start_y = max(0, min(start_y, scaled_pixmap.height()))
-                        end_x = max(0, min(end_x, scaled_pixmap.width()))
-                        end_y = max(0, min(end_y, scaled_pixmap.height()))
-                        
-                        # Calculate crop rectangle dimensions
-                        crop_x = int(min(start_x, end_x))
-                        crop_y = int(min(start_y, end_y))
-                        crop_w = int(abs(end_x - start_x))
-                        crop_h = int(abs(end_y - start_y))
-                        
-                        # Store the crop rectangle in original image coordinates
-                        self.crop_rect = (
-                            int(crop_x * scale_x),
-                            int(crop_y * scale_y),
-                            int(crop_w * scale_x),
-                            int(crop_h * scale_y)
-                        )
-                        
-                        # Draw the rectangle
-                        painter.drawRect(crop_x, crop_y, crop_w, crop_h)
-                    finally:
-                        painter.end()
-            except Exception as e:
-                print(f"Painting error: {e}")
-        
-        # Display the result
-        self.frame_label.setPixmap(display_pixmap)
+            # Convert crop coordinates and clamp both corners to the pixmap
+            corners = np.array([[self.crop_start.x() - x_offset, self.crop_start.y() - y_offset],
+                                [self.crop_end.x() - x_offset, self.crop_end.y() - y_offset]])
+            np.clip(corners, 0, (scaled_pixmap.width(), scaled_pixmap.height()), out=corners)
+            
+            # Calculate crop rectangle position and dimensions
+            crop = np.concatenate([corners.min(axis=0), np.abs(corners[1] - corners[0])]).astype(int)
+            crop_x, crop_y, crop_w, crop_h = crop.tolist()
+            
+            # Store the crop rectangle in original image coordinates
+            self.crop_rect = tuple((crop * (scale_x, scale_y, scale_x, scale_y)).astype(int).tolist())
+            
+            # Draw the rectangle in label coordinates
+            self.crop_overlay.set_rect(QRect(int(crop_x + x_offset), int(crop_y + y_offset), crop_w, crop_h))
+        else:
+            self.crop_overlay.set_rect(None)
+    
+    def _show_pixmap(self, pixmap):
+        """Put a pixmap on the label unless it is already showing"""
+        if pixmap.cacheKey() != self._label_pixmap_key:
+            self.frame_label.setPixmap(pixmap)
+            self._label_pixmap_key = pixmap.cacheKey()
     
     def mousePressEvent(self, event):
         """Handle mouse press events for crop selection"""
@@ -170,16 +440,24 @@ class PreviewWidget(QWidget):
         # Start a new crop selection
         self.crop_start = event.pos()
         self.crop_end = None
-        self._update_display()
+        self._update_display_static()
     
     def mouseMoveEvent(self, event):
         """Handle mouse move events for crop selection"""
         if not self.crop_mode or self.crop_start is None:
             return super().mouseMoveEvent(event)
             
-        # Update the crop end position as the mouse moves
+        # Update the crop end position as the mouse moves, but redraw at
+        # most once per 16 ms however fast the move events arrive
         self.crop_end = event.pos()
-        self._update_display()
+        if not self._crop_repaint_pending:
+            self._crop_repaint_pending = True
+            QTimer.singleShot(16, self._do_crop_repaint)
+    
+    def _do_crop_repaint(self):
+        """Redraw the crop selection after coalesced mouse moves"""
+        self._crop_repaint_pending = False
+        self._update_display_static()
     
     def mouseReleaseEvent(self, event):
         """Handle mouse release events to finalize crop selection"""
@@ -188,7 +466,7 @@ class PreviewWidget(QWidget):
             
         # Set the final crop end position
         self.crop_end = event.pos()
-        self._update_display()
+        self._update_display_static()
     
     def enable_crop_mode(self):
         """Enable crop mode"""
@@ -196,12 +474,15 @@ class PreviewWidget(QWidget):
         self.crop_start = None
         self.crop_end = None
         self.setCursor(Qt.CrossCursor)
+        # The crop overlay needs the frame geometry, which QMovie doesn't expose
+        if self._movie is not None:
+            self._movie_to_timer()
     
     def disable_crop_mode(self):
         """Disable crop mode"""
         self.crop_mode = False
         self.setCursor(Qt.ArrowCursor)
-        self._update_display()
+        self._update_display_static()
     
     def get_crop_rect(self):
         """Return the current crop rectangle"""
@@ -210,4 +491,13 @@ class PreviewWidget(QWidget):
     def resizeEvent(self, event):
         """Handle resize events to update the display"""
         super().resizeEvent(event)
-        self._update_display()
\ No newline at end of file
+        self.crop_overlay.setGeometry(self.frame_label.rect())
+        # Drop the playback cache; the next tick rebuilds it at the new size
+        self._scaled_pixmaps = None
+        if self._movie is not None:
+            # QMovie scales its own frames, leave the label to it
+            height, width = self.preview_frames.shape[1:3]
+            self._movie.setScaledSize(self._fit_size(width, height, self.frame_label.size()))
+            return
+        self._rescale_cached()
+        self._update_display_static()
\ No newline at end of file
@@ -5,15 +5,28 @@
 Timeline widget for video trimming functionality
 """
 
+import bisect
+import functools
+
+import cv2
 import numpy as np
 from PyQt5.QtWidgets import (QWidget, QLabel, QHBoxLayout, QVBoxLayout, QSlider,
-                            QSizePolicy, QPushButton, QStyle, QMenu, QAction, QFrame)
-from PyQt5.QtGui import QImage, QPixmap, QPainter, QPen, QColor, QLinearGradient, QPaintEvent
-from PyQt5.QtCore import Qt, QRect, QTimer, pyqtSignal, QPoint, QSize
+                            QSizePolicy, QPushButton, QStyle, QMenu, QAction, QFrame, QMessageBox)
+from PyQt5.QtGui import QImage, QPixmap, QPainter, QPainterPath, QPen, QColor, QLinearGradient, QPaintEvent
+from PyQt5.QtCore import Qt, QRect, QRectF, QLineF, QTimer, pyqtSignal, QPoint, QSize
 
 class ThumbnailStrip(QWidget):
     """Widget for displaying video thumbnails"""
     
+    # Colors and pens shared by every repaint
+    BACKGROUND_COLOR = QColor(34, 34, 34)
+    FADE_COLOR = QColor(0, 0, 0, 150)  # Semi-transparent black
+    EXCLUDE_COLOR = QColor(255, 0, 0, 100)  # Semi-transparent red
+    START_PEN = QPen(QColor(0, 255, 0), 2)
+    END_PEN = QPen(QColor(255, 0, 0), 2)
+    SEGMENT_PEN = QPen(QColor(255, 165, 0), 2)  # Orange border
+    LABEL_PEN = QPen(QColor(255, 255, 255))
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.thumbnails = []
@@ -21,20 +34,60 @@ class ThumbnailStrip(QWidget):
         self.start_time = 0
         self.end_time = 0
         self.excluded_segments = []  # List of (start, end) tuples to exclude
+        # All thumbnails packed side by side into one widget-sized RGB array,
+        # with the source array already written into each slot and the
+        # pixmap wrapping it; rebuilt when the slot layout changes
+        self._atlas = None
+        self._atlas_sources = []
+        self._atlas_key = None
+        self._atlas_pixmap = None
+        # Backdrop and translucent trim shade pre-filled at the widget size,
+        # rebuilt on resize
+        self._background = None
+        self._fade = None
+        # (size key, path, border lines, mid x positions) for excluded_segments
+        self._excluded_cache = None
+        # Scissors glyph marking excluded segments, rendered once per pixel ratio
+        self._scissors = None
         self.setMinimumHeight(60)
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
     
-    def set_thumbnails(self, thumbnails, duration, start_time=0, end_time=None):
-        """Set thumbnails and timeline parameters"""
-        self.thumbnails = thumbnails if thumbnails else []
+    def set_thumbnails(self, thumbnails, duration):
+        """Set thumbnails and the timeline duration, resetting the trim to all of it
+        
+        thumbnails is a list of (H, W, 3) RGB arrays, None for empty slots.
+        Use set_trim to move the trim indicators.
+        """
+        self.thumbnails = thumbnails if thumbnails is not None else []
+        # New contents, even with the same count and size, need a fresh atlas
+        self._atlas_key = None
         self.duration = duration
-        self.start_time = start_time
-        self.end_time = end_time if end_time is not None else duration
+        self.start_time = 0
+        self.end_time = duration
         self.update()  # Request a repaint
     
+    def set_trim(self, start_time, end_time):
+        """Move the trim indicators, repainting only the bands they cross"""
+        old_positions = (self._time_to_x(self.start_time), self._time_to_x(self.end_time))
+        self.start_time = start_time
+        self.end_time = end_time
+        new_positions = (self._time_to_x(self.start_time), self._time_to_x(self.end_time))
+        
+        for old_x, new_x in zip(old_positions, new_positions):
+            if old_x != new_x:
+                # Shading changes between the two positions; pad for the 2px line
+                self.update(QRect(min(old_x, new_x) - 2, 0, abs(new_x - old_x) + 4, self.height()))
+    
+    def _time_to_x(self, time_seconds):
+        """Return the x position of a time on the strip"""
+        if self.duration <= 0:
+            return 0
+        return int((time_seconds / self.duration) * self.width())
+    
     def set_excluded_segments(self, segments):
         """Set segments to exclude (trim out)"""
         self.excluded_segments = segments
+        self._excluded_cache = None
         self.update()  # Request a repaint
     
     def paintEvent(self, event):
@@ -46,75 +99,147 @@ class ThumbnailStrip(QWidget):
         painter = QPainter(self)
         
         try:
+            # Read the strip size once; each call is a round trip into Qt
+            width = self.width()
+            height = self.height()
+            duration = self.duration
+            
             # Draw background
-            painter.fillRect(0, 0, self.width(), self.height(), QColor(34, 34, 34))
+            if self._background is not None and self._background.size() == self.size():
+                painter.drawPixmap(0, 0, self._background)
+            else:
+                painter.fillRect(0, 0, width, height, self.BACKGROUND_COLOR)
             
-            # Draw thumbnails
+            # Draw thumbnails from the atlas in one blit; the painter clips
+            # it to the dirty rect, so trim moves only repaint what they touch
             if self.thumbnails:
-                num_thumbnails = len(self.thumbnails)
-                thumb_width = self.width() / num_thumbnails
-                
-                for i, thumbnail in enumerate(self.thumbnails):
-                    # Convert numpy array to QImage
-                    try:
-                        h, w, c = thumbnail.shape
-                        bytes_per_line = c * w
-                        q_img = QImage(thumbnail.data, w, h, bytes_per_line, QImage.Format_RGB888)
-                        
-                        # Calculate position
-                        x = i * thumb_width
-                        
-                        # Draw thumbnail
-                        painter.drawImage(QRect(int(x), 0, int(thumb_width), self.height()), q_img)
-                    except Exception as e:
-                        # Handle thumbnail drawing errors gracefully
-                        print(f"Error drawing thumbnail {i}: {e}")
+                painter.drawPixmap(0, 0, self._thumbnail_atlas(width, height))
             
             # Draw trim indicators if duration is valid
-            if self.duration > 0:
-                width = self.width()
-                height = self.height()
+            if duration > 0:
+                # Same mapping as _time_to_x, so set_trim's repaint bands match
+                start_x = int((self.start_time / duration) * width)
+                end_x = int((self.end_time / duration) * width)
                 
                 # Draw start trim line
-                start_x = int((self.start_time / self.duration) * width)
-                painter.setPen(QPen(QColor(0, 255, 0), 2))
+                painter.setPen(self.START_PEN)
                 painter.drawLine(start_x, 0, start_x, height)
                 
                 # Draw end trim line
-                end_x = int((self.end_time / self.duration) * width)
-                painter.setPen(QPen(QColor(255, 0, 0), 2))
+                painter.setPen(self.END_PEN)
                 painter.drawLine(end_x, 0, end_x, height)
                 
-                # Shade areas outside the trim region
-                fade_color = QColor(0, 0, 0, 150)  # Semi-transparent black
-                
-                # Shade left of start
-                painter.fillRect(0, 0, start_x, height, fade_color)
-                
-                # Shade right of end
-                painter.fillRect(end_x, 0, width - end_x, height, fade_color)
+                # Shade areas outside the trim region by blitting the matching
+                # strips of the pre-filled shade; a zero source width would
+                # draw the whole pixmap, so empty strips are skipped
+                if self._fade is not None and self._fade.size() == self.size():
+                    if start_x > 0:
+                        painter.drawPixmap(0, 0, self._fade, 0, 0, start_x, height)
+                    if end_x < width:
+                        painter.drawPixmap(end_x, 0, self._fade, end_x, 0, width - end_x, height)
+                else:
+                    painter.fillRect(0, 0, start_x, height, self.FADE_COLOR)
+                    painter.fillRect(end_x, 0, width - end_x, height, self.FADE_COLOR)
                 
                 # Shade excluded segments
-                exclude_color = QColor(255, 0, 0, 100)  # Semi-transparent red
-                for start, end in self.excluded_segments:
-                    # Convert time to x positions
-                    ex_start = int((start / self.duration) * width)
-                    ex_end = int((end / self.duration) * width)
-                    # Draw the excluded area
-                    painter.fillRect(ex_start, 0, ex_end - ex_start, height, exclude_color)
+                if self.excluded_segments:
+                    excluded_area, borders, mid_points = self._excluded_geometry(width, height)
                     
-                    # Draw segment border lines
-                    painter.setPen(QPen(QColor(255, 165, 0), 2))  # Orange border
-                    painter.drawLine(ex_start, 0, ex_start, height)
-                    painter.drawLine(ex_end, 0, ex_end, height)
+                    # Draw the excluded areas and their border lines
+                    painter.fillPath(excluded_area, self.EXCLUDE_COLOR)
+                    painter.setPen(self.SEGMENT_PEN)
+                    painter.drawLines(borders)
                     
-                    # Draw scissors icon or label
-                    painter.setPen(QColor(255, 255, 255))
-                    mid_x = (ex_start + ex_end) / 2
-                    painter.drawText(int(mid_x - 10), int(height / 2), "✂")
+                    # Draw scissors icons, their baseline at mid height
+                    scissors, ascent = self._scissors_pixmap()
+                    for mid_x in mid_points:
+                        painter.drawPixmap(int(mid_x - 10), int(height / 2) - ascent, scissors)
         finally:
             # Ensure painter is properly ended
             painter.end()
+    
+    def _excluded_geometry(self, width, height):
+        """Return the shading path, border lines and mid x positions of the excluded segments
+        
+        Everything is mapped to pixels in one NumPy pass and reused until the
+        segments, duration or strip size change, so the shading and borders
+        can each go to the painter in one call.
+        """
+        key = (width, height, self.duration)
+        if self._excluded_cache is None or self._excluded_cache[0] != key:
+            segments = np.asarray(self.excluded_segments, dtype=np.float64).reshape(-1, 2)
+            positions = (segments / self.duration * width).astype(np.int32)
+            
+            excluded_area = QPainterPath()
+            excluded_area.setFillRule(Qt.WindingFill)
+            borders = []
+            for ex_start, ex_end in positions.tolist():
+                excluded_area.addRect(QRectF(ex_start, 0, ex_end - ex_start, height))
+                borders.append(QLineF(ex_start, 0, ex_start, height))
+                borders.append(QLineF(ex_end, 0, ex_end, height))
+            mid_points = (positions.sum(axis=1) / 2).tolist()
+            self._excluded_cache = (key, excluded_area, borders, mid_points)
+        return self._excluded_cache[1:]
+    
+    def _scissors_pixmap(self):
+        """Return the scissors glyph as a pixmap and its ascent, rendering it on first use"""
+        ratio = self.devicePixelRatioF()
+        if self._scissors is None or self._scissors[0] != ratio:
+            metrics = self.fontMetrics()
+            pixmap = QPixmap(int(metrics.horizontalAdvance("✂") * ratio) + 1,
+                             int(metrics.height() * ratio) + 1)
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.transparent)
+            glyph_painter = QPainter(pixmap)
+            try:
+                glyph_painter.setFont(self.font())
+                glyph_painter.setPen(self.LABEL_PEN)
+                glyph_painter.drawText(0, metrics.ascent(), "✂")
+            finally:
+                glyph_painter.end()
+            self._scissors = (ratio, pixmap, metrics.ascent())
+        return self._scissors[1], self._scissors[2]
+    
+    def resizeEvent(self, event):
+        """Rebuild the backdrop and trim shade at the new size"""
+        super().resizeEvent(event)
+        self._background = QPixmap(self.size())
+        self._background.fill(self.BACKGROUND_COLOR)
+        self._fade = QPixmap(self.size())
+        self._fade.fill(self.FADE_COLOR)
+    
+    def _thumbnail_atlas(self, width, height):
+        """Return a width x height pixmap of all thumbnails in their slots, scaling only new ones"""
+        width, height = max(1, width), max(1, height)
+        num_thumbnails = len(self.thumbnails)
+        key = (num_thumbnails, width, height)
+        if key != self._atlas_key:
+            # Slots still being decoded show the background through the atlas
+            self._atlas = np.empty((height, width, 3), dtype=np.uint8)
+            self._atlas[:] = self.BACKGROUND_COLOR.getRgb()[:3]
+            self._atlas_sources = [None] * num_thumbnails
+            self._atlas_key = key
+            self._atlas_pixmap = None
+            
+        thumb_width = width / num_thumbnails
+        slot_width = max(1, int(thumb_width))
+        changed = False
+        for i, thumbnail in enumerate(self.thumbnails):
+            # Slots filled in later get a new source array
+            if thumbnail is None or self._atlas_sources[i] is thumbnail:
+                continue
+            x = int(i * thumb_width)
+            self._atlas[:, x:x + slot_width] = cv2.resize(
+                thumbnail, (slot_width, height), interpolation=cv2.INTER_AREA)[:, :width - x]
+            self._atlas_sources[i] = thumbnail
+            changed = True
+            
+        if changed or self._atlas_pixmap is None:
+            q_img = QImage(self._atlas.data, width, height, self._atlas.strides[0], QImage.Format_RGB888)
+            # The pixmap may share the atlas memory, so it keeps a reference
+            self._atlas_pixmap = QPixmap.fromImage(q_img)
+            self._atlas_pixmap._source_array = self._atlas
+        return self._atlas_pixmap
 
 
 class TimelineWidget(QWidget):
@@ -122,6 +247,8 @@ class TimelineWidget(QWidget):
     
     # Signal to notify when trim values change
     trim_changed = pyqtSignal(float, float)
+    # Signal to notify when a trim slider handle is released
+    trim_released = pyqtSignal(float, float)
     # Signal to notify when excluded segments change
     segments_changed = pyqtSignal(list)
     
@@ -129,6 +256,8 @@ class TimelineWidget(QWidget):
         super().__init__(parent)
         
         self.thumbnails = []
+        # Contiguous (N, H, W, 3) RGB array; thumbnails holds views of its slices
+        self.thumbnail_buffer = None
         self.duration = 0
         self.start_time = 0
         self.end_time = 0
@@ -157,6 +286,18 @@ class TimelineWidget(QWidget):
         self.end_slider.setValue(1000)
         self.end_slider.setTracking(True)
         self.end_slider.valueChanged.connect(self.update_end_trim)
+
+        self.start_slider.sliderReleased.connect(self.on_slider_released)
+        self.end_slider.sliderReleased.connect(self.on_slider_released)
+        
+        # Slider moves update the trim times at once, but the repaint, labels
+        # and trim_changed are applied at most once per 16 ms
+        self._trim_timer = QTimer(self)
+        self._trim_timer.setSingleShot(True)
+        self._trim_timer.setInterval(16)
+        self._trim_timer.timeout.connect(self._apply_trim)
+        # Trim times last sent with trim_changed
+        self._emitted_trim = None
         
         # Create buttons for handling trimming segments
         self.trim_button = QPushButton("Trim Out Segment")
@@ -207,8 +348,12 @@ class TimelineWidget(QWidget):
         
         self.setEnabled(False)
     
-    def setup_timeline(self, duration, thumbnails=None):
-        """Setup the timeline with duration and thumbnails"""
+    def setup_timeline(self, duration, thumbnails=None, thumbnail_count=0):
+        """Setup the timeline with duration and thumbnails
+        
+        When thumbnails are not available yet, thumbnail_count empty slots are
+        reserved and filled later through add_thumbnail.
+        """
         self.duration = duration
         self.start_time = 0
         self.end_time = duration
@@ -224,12 +369,25 @@ class TimelineWidget(QWidget):
         self.start_slider.blockSignals(False)
         self.end_slider.blockSignals(False)
         
-        # Store thumbnails
-        if thumbnails:
-            self.thumbnails = thumbnails
+        # Store thumbnails in one contiguous array; the strip scales them to
+        # its slots itself
+        buffer = None
+        if thumbnails is not None and len(thumbnails):
+            buffer = np.ascontiguousarray(np.stack(thumbnails), dtype=np.uint8)
+            # Check here so painting never meets a thumbnail it cannot draw
+            if buffer.ndim != 4 or buffer.shape[3] != 3 or 0 in buffer.shape:
+                print(f"Ignoring thumbnails with shape {buffer.shape}")
+                buffer = None
+        if buffer is not None:
+            self.thumbnail_buffer = buffer
+            self.thumbnails = list(self.thumbnail_buffer)
+        else:
+            self.thumbnail_buffer = None
+            self.thumbnails = [None] * thumbnail_count
             
-        # Update thumbnail strip
-        self.thumbnail_strip.set_thumbnails(self.thumbnails, self.duration, self.start_time, self.end_time)
+        # Update thumbnail strip; trim moves later only go through set_trim
+        self.thumbnail_strip.set_thumbnails(self.thumbnails, self.duration)
+        self.thumbnail_strip.set_trim(self.start_time, self.end_time)
         self.thumbnail_strip.set_excluded_segments(self.excluded_segments)
         
         # Update time labels
@@ -239,9 +397,25 @@ class TimelineWidget(QWidget):
         self.setEnabled(True)
         
         # Emit the initial trim values
+        self._emitted_trim = (self.start_time, self.end_time)
         self.trim_changed.emit(self.start_time, self.end_time)
         self.segments_changed.emit(self.excluded_segments)
     
+    def add_thumbnail(self, index, thumbnail):
+        """Fill one thumbnail slot once it has been decoded"""
+        # Check here so painting never meets a thumbnail it cannot draw
+        thumbnail = np.asarray(thumbnail)
+        if thumbnail.ndim != 3 or thumbnail.shape[2] != 3 or 0 in thumbnail.shape:
+            print(f"Ignoring thumbnail {index} with shape {thumbnail.shape}")
+            return
+        if 0 <= index < len(self.thumbnails):
+            # All thumbnails share one size, so the first one sizes the buffer
+            if self.thumbnail_buffer is None or self.thumbnail_buffer.shape[1:] != thumbnail.shape:
+                self.thumbnail_buffer = np.zeros((len(self.thumbnails),) + thumbnail.shape, np.uint8)
+            self.thumbnail_buffer[index] = thumbnail
+            self.thumbnails[index] = self.thumbnail_buffer[index]
+            self.thumbnail_strip.update()
+    
     def update_thumbnail_strip(self):
         """Update the thumbnail strip with the current thumbnails"""
         # This function is responsible for painting thumbnails and would be more complex
@@ -268,14 +442,9 @@ class TimelineWidget(QWidget):
         # Update start time
         self.start_time = new_start
         
-        # Update thumbnail strip to reflect new start time
-        self.thumbnail_strip.set_thumbnails(self.thumbnails, self.duration, self.start_time, self.end_time)
-        
-        # Update display
-        self.update_time_labels()
-        
-        # Notify of change
-        self.trim_changed.emit(self.start_time, self.end_time)
+        # Redraw and notify at most once per 16 ms while dragging
+        if not self._trim_timer.isActive():
+            self._trim_timer.start()
     
     def update_end_trim(self):
         """Update end trim position from slider value"""
@@ -297,44 +466,56 @@ class TimelineWidget(QWidget):
         # Update end time
         self.end_time = new_end
         
-        # Update thumbnail strip to reflect new end time
-        self.thumbnail_strip.set_thumbnails(self.thumbnails, self.duration, self.start_time, self.end_time)
+        # Redraw and notify at most once per 16 ms while dragging
+        if not self._trim_timer.isActive():
+            self._trim_timer.start()
+    
+    def _apply_trim(self):
+        """Show the current trim times and notify of the change"""
+        self._trim_timer.stop()
+        
+        # Clamped moves can land back on the times already sent
+        last = self._emitted_trim
+        if last is not None and abs(self.start_time - last[0]) <= 1e-6 and abs(self.end_time - last[1]) <= 1e-6:
+            return
+        
+        # Update thumbnail strip to reflect new trim times
+        self.thumbnail_strip.set_trim(self.start_time, self.end_time)
         
         # Update display
         self.update_time_labels()
         
         # Notify of change
+        self._emitted_trim = (self.start_time, self.end_time)
         self.trim_changed.emit(self.start_time, self.end_time)
     
+    def on_slider_released(self):
+        """Notify that the user finished dragging a trim handle"""
+        # Apply a pending move first so trim_changed precedes trim_released
+        if self._trim_timer.isActive():
+            self._apply_trim()
+        self.trim_released.emit(self.start_time, self.end_time)
+    
     def update_time_labels(self):
         """Update the time display labels"""
-        # Format start time
-        minutes_start = int(self.start_time / 60)
-        seconds_start = self.start_time % 60
-        self.start_time_label.setText(f"{minutes_start:02d}:{seconds_start:05.2f}")
-        
-        # Format end time
-        minutes_end = int(self.end_time / 60)
-        seconds_end = self.end_time % 60
-        self.end_time_label.setText(f"{minutes_end:02d}:{seconds_end:05.2f}")
+        self.start_time_label.setText(format_time(self.start_time))
+        self.end_time_label.setText(format_time(self.end_time))
         
         # Format duration
         trim_duration = self.end_time - self.start_time
         
-        # Calculate effective duration by excluding segments
-        excluded_duration = 0
-        for start, end in self.excluded_segments:
-            # Only count segments that overlap with the selected range
-            if end > self.start_time and start < self.end_time:
-                overlap_start = max(start, self.start_time)
-                overlap_end = min(end, self.end_time)
-                excluded_duration += (overlap_end - overlap_start)
+        # Calculate effective duration by excluding the part of each segment
+        # that overlaps the selected range
+        if len(self.excluded_segments) > 4:
+            clipped = np.clip(np.asarray(self.excluded_segments, dtype=np.float64),
+                              self.start_time, self.end_time)
+            excluded_duration = float(np.sum(clipped[:, 1] - clipped[:, 0]))
+        else:
+            excluded_duration = sum(max(0.0, min(end, self.end_time) - max(start, self.start_time))
+                                    for start, end in self.excluded_segments)
         
         effective_duration = trim_duration - excluded_duration
-        
-        minutes_dur = int(effective_duration / 60)
-        seconds_dur = effective_duration % 60
-        self.duration_label.setText(f"Duration: {minutes_dur:02d}:{seconds_dur:05.2f}")
+        self.duration_label.setText("Duration: " + format_time(effective_duration))
     
     def get_trim_values(self):
         """Return the current trim values"""
@@ -354,35 +535,18 @@ class TimelineWidget(QWidget):
             # If no exclusions, just return the main segment
             return [(self.start_time, self.end_time)]
         
-        # Sort excluded segments by start time
-        sorted_exclusions = sorted(self.excluded_segments)
-        
-        # Start with the primary segment
-        effective_segments = []
-        current_start = self.start_time
-        
-        # Iterate through exclusions to create effective segments
-        for exclusion_start, exclusion_end in sorted_exclusions:
-            # Only process exclusions that overlap with the primary segment
-            if exclusion_end <= self.start_time or exclusion_start >= self.end_time:
-                continue
-                
-            # Clip the exclusion to the primary segment boundaries
-            exclusion_start = max(exclusion_start, self.start_time)
-            exclusion_end = min(exclusion_end, self.end_time)
-            
-            # Add segment before this exclusion if it has length > 0
-            if exclusion_start > current_start:
-                effective_segments.append((current_start, exclusion_start))
-                
-            # Move current start to after this exclusion
-            current_start = exclusion_end
-        
-        # Add final segment if needed
-        if current_start < self.end_time:
-            effective_segments.append((current_start, self.end_time))
-            
-        return effective_segments
+        # Clip the sorted, non-overlapping exclusions to the primary segment,
+        # dropping the ones outside it
+        exclusions = np.asarray(merge_overlapping_segments(self.excluded_segments))
+        inside = (exclusions[:, 1] > self.start_time) & (exclusions[:, 0] < self.end_time)
+        exclusions = np.clip(exclusions[inside], self.start_time, self.end_time)
+        
+        # Kept segments run from each exclusion's end to the next one's start,
+        # bounded by the primary segment; empty gaps are dropped
+        starts = np.concatenate([[self.start_time], exclusions[:, 1]])
+        ends = np.concatenate([exclusions[:, 0], [self.end_time]])
+        keep = starts < ends
+        return list(zip(starts[keep].tolist(), ends[keep].tolist()))
     
     def mousePressEvent(self, event):
         """Handle mouse press for segment selection"""
@@ -434,9 +598,11 @@ class TimelineWidget(QWidget):
         self.exit_segment_selection_mode()
     
     def add_excluded_segment(self, start_time, end_time):
-        """Add a new segment to exclude"""
-        from PyQt5.QtWidgets import QMessageBox
+        """Ask to exclude a segment, adding it once the user confirms
         
+        The dialogs are opened without blocking, so the timeline keeps
+        painting and handling events while they are up.
+        """
         # Format times for display
         start_str = format_time(start_time)
         end_str = format_time(end_time)
@@ -444,37 +610,42 @@ class TimelineWidget(QWidget):
         duration_str = format_time(duration)
         
         # Show confirmation dialog
-        msg = QMessageBox()
+        msg = QMessageBox(self)
         msg.setIcon(QMessageBox.Question)
         msg.setWindowTitle("Confirm Trim")
         msg.setText(f"Trim out segment from {start_str} to {end_str}?")
         msg.setInformativeText(f"This will remove {duration_str} from your video.")
         msg.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
         msg.setDefaultButton(QMessageBox.Yes)
-        
-        if msg.exec_() == QMessageBox.Yes:
-            # Add the new segment
-            self.excluded_segments.append((start_time, end_time))
-            
-            # Merge overlapping segments
-            self.excluded_segments = merge_overlapping_segments(self.excluded_segments)
-            
-            # Update display and notify
-            self.thumbnail_strip.set_excluded_segments(self.excluded_segments)
-            self.update_time_labels()
-            self.segments_changed.emit(self.excluded_segments)
-            
-            # Show success message
-            msg = QMessageBox()
-            msg.setIcon(QMessageBox.Information)
-            msg.setWindowTitle("Segment Trimmed")
-            msg.setText("The segment has been marked for removal.")
-            msg.setInformativeText("Generate a preview to see how your video will look.")
-            msg.setStandardButtons(QMessageBox.Ok)
-            msg.exec_()
+        msg.finished.connect(functools.partial(self._on_confirm_trim, start_time, end_time))
+        self._open_dialog(msg)
+    
+    def _on_confirm_trim(self, start_time, end_time, result):
+        """Add the segment if the trim was confirmed"""
+        if result != QMessageBox.Yes:
+            return
             
-            return True
-        return False
+        # Add the new segment, merging it with the segments it overlaps
+        self.excluded_segments = insert_segment(self.excluded_segments, start_time, end_time)
+        
+        # Update display and notify
+        self.thumbnail_strip.set_excluded_segments(self.excluded_segments)
+        self.update_time_labels()
+        self.segments_changed.emit(self.excluded_segments)
+        
+        # Show success message
+        msg = QMessageBox(self)
+        msg.setIcon(QMessageBox.Information)
+        msg.setWindowTitle("Segment Trimmed")
+        msg.setText("The segment has been marked for removal.")
+        msg.setInformativeText("Generate a preview to see how your video will look.")
+        msg.setStandardButtons(QMessageBox.Ok)
+        self._open_dialog(msg)
+    
+    def _open_dialog(self, msg):
+        """Show a message box without blocking and free it once it closes"""
+        msg.setAttribute(Qt.WA_DeleteOnClose)
+        msg.open()
     
     def start_segment_selection(self):
         """Start the process of selecting a segment to exclude"""
@@ -522,9 +693,34 @@ class TimelineWidget(QWidget):
 
 def format_time(seconds):
     """Format time in seconds to MM:SS.ss format"""
-    minutes = int(seconds / 60)
-    secs = seconds % 60
-    return f"{minutes:02d}:{secs:05.2f}"
+    # printf-style formatting skips the format-spec parsing of an f-string
+    return "%02d:%05.2f" % (int(seconds / 60), seconds % 60)
+
+
+def insert_segment(segments, start, end):
+    """Return sorted, non-overlapping segments with (start, end) added
+    
+    Only the neighbours of the insertion point can overlap the new segment,
+    so it is placed by binary search and merged locally instead of sorting
+    and merging the whole list again.
+    """
+    segments = list(segments)
+    i = bisect.bisect_left(segments, (start, end))
+    
+    # Take in the previous segment if it reaches the new one
+    if i > 0 and segments[i - 1][1] >= start:
+        i -= 1
+        start = segments[i][0]
+        end = max(end, segments[i][1])
+        
+    # Take in the following segments that start before it ends
+    j = i
+    while j < len(segments) and segments[j][0] <= end:
+        end = max(end, segments[j][1])
+        j += 1
+        
+    segments[i:j] = [(float(start), float(end))]
+    return segments
 
 
 def merge_overlapping_segments(segments):
@@ -532,19 +728,16 @@ def merge_overlapping_segments(segments):
     if not segments:
         return []
         
-    # Sort segments by start time
-    sorted_segments = sorted(segments)
-    merged = [sorted_segments[0]]
+    # Sort segments by start time, then end time
+    segs = np.asarray(segments, dtype=np.float64).reshape(-1, 2)
+    segs = segs[np.lexsort((segs[:, 1], segs[:, 0]))]
     
-    for current in sorted_segments[1:]:
-        previous = merged[-1]
-        
-        # If current segment overlaps with previous one
-        if current[0] <= previous[1]:
-            # Merge them by updating the end time of the previous segment
-            merged[-1] = (previous[0], max(previous[1], current[1]))
-        else:
-            # No overlap, add as separate segment
-            merged.append(current)
-            
-    return merged
\ No newline at end of file
+    # A segment overlaps the ones before it when it starts before the
+    # furthest end time seen so far; otherwise it opens a new merged segment
+    ends = np.maximum.accumulate(segs[:, 1])
+    opens = np.ones(len(segs), dtype=bool)
+    opens[1:] = segs[1:, 0] > ends[:-1]
+    first = np.flatnonzero(opens)
+    last = np.append(first[1:] - 1, len(segs) - 1)
+    
+    return list(zip(segs[first, 0].tolist(), ends[last].tolist()))
\ No newline at end of file
@@ -4,14 +4,21 @@ import numpy as np
 from PyQt5.QtGui import QImage
 from PyQt5.QtCore import QSize
 import sys
+import importlib.util
 import subprocess
+import threading
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-# Ensure all required packages are installed
-required_packages = ['moviepy', 'imageio', 'imageio-ffmpeg', 'numpy']
-for package in required_packages:
-    try:
-        __import__(package)
-    except ImportError:
+import gif_encoder
+
+# Ensure all required packages are installed, keyed by import name since
+# that differs from the pip distribution name for imageio-ffmpeg; find_spec
+# only locates a module, so this costs no imports when everything is there
+required_packages = {'moviepy': 'moviepy', 'imageio': 'imageio', 'imageio_ffmpeg': 'imageio-ffmpeg', 'numpy': 'numpy'}
+for module_name, package in required_packages.items():
+    if importlib.util.find_spec(module_name) is None:
         print(f"Installing {package}...")
         subprocess.check_call([sys.executable, "-m", "pip", "install", package])
 
@@ -39,6 +46,7 @@ except ImportError as e:
                 int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
                 int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             )
+            self._next_frame = 0  # Index the capture will decode next, -1 if unknown
             self._initialize()
             
         def _initialize(self):
@@ -95,37 +103,103 @@ except ImportError as e:
                 # Calculate frame step to maintain original speed
                 frame_step = total_frames / desired_frame_count if desired_frame_count > 0 else 1
                 
+                # Source frames to keep, ascending; a step below one repeats
+                # a frame, so the same index can appear more than once
+                selected = [int(start_frame + i * frame_step) for i in range(desired_frame_count)]
+                selected = [index for index in selected if index < end_frame]
+                
                 frames = []
+                # Seek once, then walk the decoder forward; seeking per output
+                # frame would re-decode from the previous keyframe every time
                 self.cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+                self._next_frame = -1
                 
                 print(f"Extracting frames: duration={time_duration:.2f}s, target_fps={target_fps}, frame_step={frame_step:.2f}")
-                current_frame = start_frame
-                frame_count = 0
                 
-                while current_frame < end_frame and frame_count < desired_frame_count:
-                    # Set position to the next frame we want
-                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, int(current_frame))
-                    ret, frame = self.cap.read()
-                    if not ret:
-                        break
-                        
-                    # Process frame
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    
-                    # Apply crop if specified
-                    if self.crop_area:
-                        x1, y1, x2, y2 = self.crop_area
-                        frame = frame[y1:y2, x1:x2]
-                    
-                    # Apply resize if needed
+                # Decode on a producer thread while this one converts, crops and
+                # resizes; the bounded queue caps how far decoding runs ahead
+                decoded = queue.Queue(maxsize=16)
+                stop = threading.Event()
+                
+                def decode_selected():
+                    try:
+                        wanted = sorted(set(selected))
+                        next_wanted = 0
+                        for frame_index in range(start_frame, end_frame):
+                            if next_wanted >= len(wanted) or stop.is_set():
+                                break
+                            # Skipped frames are only grabbed, never converted
+                            if not self.cap.grab():
+                                break
+                            if frame_index != wanted[next_wanted]:
+                                continue
+                            ret, frame = self.cap.retrieve()
+                            if not ret:
+                                break
+                            decoded.put((frame_index, frame))
+                            next_wanted += 1
+                    finally:
+                        decoded.put(None)
+                
+                # Without a crop or resize the decoded frames are used as they
+                # are; otherwise one array holds every distinct processed frame,
+                # at the size frames come out at (crop boxes are clamped like slicing)
+                passthrough = not self.crop_area and self.target_size == self.size
+                if passthrough:
+                    prepared = None
+                else:
                     if self.target_size != self.size:
-                        frame = cv2.resize(frame, self.target_size)
-                    
-                    frames.append(frame)
-                    frame_count += 1
-                    
-                    # Move to next frame position to maintain original speed
-                    current_frame += frame_step
+                        out_width, out_height = self.target_size
+                    else:
+                        x1, y1, x2, y2 = self.crop_area
+                        out_width = len(range(self.size[0])[x1:x2])
+                        out_height = len(range(self.size[1])[y1:y2])
+                    prepared = np.empty((len(set(selected)), out_height, out_width, 3), np.uint8)
+                prepared_count = 0
+                
+                producer = threading.Thread(target=decode_selected, daemon=True)
+                producer.start()
+                next_selected = 0
+                
+                try:
+                    while True:
+                        item = decoded.get()
+                        if item is None:
+                            break
+                        frame_index, frame = item
+                        
+                        if not passthrough:
+                            # Apply crop if specified
+                            if self.crop_area:
+                                x1, y1, x2, y2 = self.crop_area
+                                frame = frame[y1:y2, x1:x2]
+                            
+                            # Resize if needed, straight into the frame's slot of the
+                            # preallocated array; a plain crop is copied out of the
+                            # decoded frame so that can be freed
+                            slot = prepared[prepared_count]
+                            prepared_count += 1
+                            if self.target_size != self.size:
+                                cv2.resize(frame, self.target_size, dst=slot)
+                            else:
+                                slot[...] = frame
+                            frame = slot
+                        
+                        # Swap to RGB as a reversed-channel view; imageio copies
+                        # it once when encoding, so no converted frame is stored
+                        frame = frame[:, :, ::-1]
+                        
+                        while next_selected < len(selected) and selected[next_selected] == frame_index:
+                            frames.append(frame)
+                            next_selected += 1
+                finally:
+                    # Unblock and finish the producer if processing failed
+                    stop.set()
+                    while producer.is_alive():
+                        try:
+                            decoded.get(timeout=0.1)
+                        except queue.Empty:
+                            pass
                 
                 if frames:
                     print(f"Writing {len(frames)} frames to GIF at {target_fps} fps")
@@ -139,16 +213,23 @@ except ImportError as e:
             except Exception as e:
                 print(f"Error creating GIF: {str(e)}")
                 return False
-            finally:
-                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
         
         def get_frame(self, t):
             """Get a specific frame at time t"""
             frame_idx = int(t * self.fps)
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            skip = frame_idx - self._next_frame
+            if self._next_frame >= 0 and 0 <= skip <= MAX_FORWARD_GRAB:
+                # Close ahead - decoding forward is cheaper than a keyframe seek
+                for _ in range(skip):
+                    if not self.cap.grab():
+                        break
+            else:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
             ret, frame = self.cap.read()
             if ret:
+                self._next_frame = frame_idx + 1
                 return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            self._next_frame = -1
             return None
             
         def close(self):
@@ -156,9 +237,119 @@ except ImportError as e:
             if hasattr(self, 'cap'):
                 self.cap.release()
 
+# NVIDIA VideoProcessingFramework is optional - previews are decoded on
+# the GPU when it is installed and on the CPU through OpenCV otherwise
+try:
+    import PyNvCodec as nvc
+    NVDEC_AVAILABLE = True
+except ImportError:
+    NVDEC_AVAILABLE = False
+
+# The ffmpeg binary bundled with imageio-ffmpeg decodes, crops and scales GIF
+# export frames in a single filter graph; OpenCV is used when it is missing
+try:
+    import imageio_ffmpeg
+    FFMPEG_EXE = imageio_ffmpeg.get_ffmpeg_exe()
+except Exception:
+    FFMPEG_EXE = None
+
+# Multi-segment GIF exports whose frames need more than this many bytes keep
+# them memory-mapped on disk instead of in RAM
+MEMMAP_FRAMES_BYTES = 256 * 1024 * 1024
+
+# Seeks this many frames (or fewer) ahead of the decoder are done by grabbing
+# forward, which avoids a keyframe seek and GOP re-decode; grabbing skips the
+# colour conversion, so it stays cheaper than a seek well past a few frames
+MAX_FORWARD_GRAB = 30
+
+# Decoded source frames kept for preview re-renders, so changing the size,
+# crop or quality of the same range does not decode it again
+FRAME_CACHE_BYTES = 512 * 1024 * 1024
+
+class FrameCache:
+    """Thread-safe LRU of decoded BGR frames keyed by frame number, bounded in bytes"""
+    
+    def __init__(self, max_bytes=FRAME_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.frames = OrderedDict()
+        self.nbytes = 0
+        self.lock = threading.Lock()
+    
+    def get(self, frame_number):
+        """Return the cached frame, or None"""
+        with self.lock:
+            frame = self.frames.get(frame_number)
+            if frame is not None:
+                self.frames.move_to_end(frame_number)
+            return frame
+    
+    def put(self, frame_number, frame):
+        """Cache a frame, evicting the least recently used ones over the budget"""
+        if frame.nbytes > self.max_bytes:
+            return
+        with self.lock:
+            old = self.frames.pop(frame_number, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self.frames[frame_number] = frame
+            self.nbytes += frame.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self.frames.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+    
+    def clear(self):
+        """Drop every cached frame"""
+        with self.lock:
+            self.frames.clear()
+            self.nbytes = 0
+
+class FfmpegGifWriter:
+    """GIF writer that pipes RGB frames into ffmpeg's palettegen/paletteuse filters
+    
+    Has the append_data/close interface of an imageio writer. ffmpeg builds
+    one palette over all frames and dithers every frame against it in native
+    code, which is faster and looks better than imageio's per-frame quantizer.
+    """
+    
+    def __init__(self, output_path, width, height, fps, quality, loop_param=0):
+        max_colors = gif_encoder.palette_size_for_quality(quality)
+        filters = (f"split[s0][s1];[s0]palettegen=max_colors={max_colors}:stats_mode=full[p];"
+                   f"[s1][p]paletteuse=dither=sierra2_4a")
+        # The GIF muxer loops forever at 0 and plays once at -1
+        cmd = [FFMPEG_EXE, '-v', 'error', '-y',
+               '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f"{width}x{height}", '-r', str(fps), '-i', '-',
+               '-vf', filters, '-loop', '0' if loop_param == 0 else '-1', '-f', 'gif', output_path]
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    
+    def append_data(self, frame):
+        """Send one (H, W, 3) uint8 RGB frame to ffmpeg"""
+        self._proc.stdin.write(np.ascontiguousarray(frame).data)
+    
+    def close(self):
+        """Finish the GIF, raising if ffmpeg failed"""
+        try:
+            self._proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        error = self._proc.stderr.read()
+        self._proc.stderr.close()
+        if self._proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg GIF encoding failed: {error.decode(errors='replace').strip()}")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
 class VideoProcessor:
     def __init__(self):
         self.cap = None
+        self._next_frame = -1  # Index the capture will decode next, -1 if unknown
+        self._resize_scratch = None  # Reused BGR target for preview downscales
+        self._frame_cache = FrameCache()  # Shared with readers, see open_reader
+        # ffmpeg hardware decoder for GIF exports, dropped once it fails
+        self._ffmpeg_hwaccel = 'cuda' if NVDEC_AVAILABLE else None
         self.video_path = None
         self.fps = 0
         self.frame_count = 0
@@ -180,12 +371,12 @@ class VideoProcessor:
                 clip.close()
                 
                 # OpenCV can still read GIFs frame by frame
-                self.cap = cv2.VideoCapture(video_path)
+                self._open_capture(video_path)
                 if not self.cap.isOpened():
                     return False
             else:
                 # For other video formats, use OpenCV
-                self.cap = cv2.VideoCapture(video_path)
+                self._open_capture(video_path)
                 if not self.cap.isOpened():
                     return False
                 
@@ -196,11 +387,33 @@ class VideoProcessor:
                 self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             
             self.video_path = video_path
+            # A fresh cache rather than clear(): readers of the previous video
+            # still hold the old one and may keep filling it
+            self._frame_cache = FrameCache()
             return True
         except Exception as e:
             print(f"Error loading video: {str(e)}")
             return False
     
+    def _open_capture(self, video_path):
+        """Open the capture that is kept for the whole session"""
+        if self.cap is not None:
+            self.cap.release()
+        self.cap = cv2.VideoCapture(video_path)
+        self._next_frame = 0
+    
+    def _seek(self, frame_number):
+        """Position the capture so the next read returns frame_number"""
+        skip = frame_number - self._next_frame
+        if self._next_frame >= 0 and 0 <= skip <= MAX_FORWARD_GRAB:
+            # Close ahead - decoding forward is cheaper than a keyframe seek
+            for _ in range(skip):
+                if not self.cap.grab():
+                    break
+        else:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        self._next_frame = frame_number
+    
     def create_gif(self, output_path, start_time, end_time, fps, dimensions, quality, crop_rect=None, loop=True, progress_callback=None, segments=None, speed_factor=1.0):
         """Create a GIF with the specified parameters
         
@@ -239,124 +452,90 @@ class VideoProcessor:
                         
                         # Create a temporary directory for segment GIFs
                         with tempfile.TemporaryDirectory() as temp_dir:
-                            all_frames = []
                             target_width, target_height = dimensions
                             
-                            # Process each segment
-                            for i, (seg_start, seg_end) in enumerate(segments):
-                                if progress_callback:
-                                    segment_progress = i / len(segments) * 40  # 0-40% for segment processing
-                                    progress_callback(int(segment_progress))
-                                
-                                # Important: create a subclip using the original segment times, not adjusted for speed
-                                clip = VideoFileClip(self.video_path).subclip(seg_start, seg_end)
-                                seg_duration = clip.duration
-                                
-                                # Apply cropping if needed
-                                if crop_rect is not None:
-                                    x, y, w, h = crop_rect
-                                    clip = clip.crop(x1=x, y1=y, x2=x+w, y2=y+h)
-                                
-                                # Always apply resize to ensure consistent dimensions across segments
-                                clip = clip.resize(height=target_height, width=target_width)
-                                
-                                # Set output fps
-                                clip = clip.set_fps(fps)
-                                
+                            # Important: use the original segment times, not adjusted for speed
+                            clips = []
+                            for seg_start, seg_end in segments:
+                                seg_start = max(0, seg_start)
+                                seg_duration = min(self.duration, seg_end) - seg_start
                                 # Calculate how many frames we want in the final output
                                 # Apply speed factor to determine frame count
                                 # Higher speed = fewer frames
-                                frame_count = int(seg_duration * fps / speed_factor)
-                                
-                                # Extract frames at proper intervals to achieve the desired speed
-                                segment_frames = []
-                                if frame_count > 0:
-                                    # Calculate the time step between frames
-                                    # For higher speeds, we take larger steps through the original clip
-                                    time_step = seg_duration / frame_count
-                                    
-                                    for f in range(frame_count):
-                                        # Calculate time point in the clip
-                                        frame_time = f * time_step
+                                clips.append((seg_start, seg_duration, max(0, int(seg_duration * fps / speed_factor))))
+                            
+                            # Every frame is written straight into its slot of one preallocated
+                            # array, so all frames share one shape by construction
+                            offsets = np.concatenate([[0], np.cumsum([count for _, _, count in clips])]).astype(int)
+                            frames_shape = (offsets[-1], target_height, target_width, 3)
+                            if offsets[-1] and np.prod(frames_shape) > MEMMAP_FRAMES_BYTES:
+                                # Long GIFs keep their frames in an anonymous temporary
+                                # file, so the OS can page out frames already written
+                                all_frames = np.memmap(tempfile.TemporaryFile(), dtype=np.uint8, mode='w+',
+                                                       shape=frames_shape)
+                            else:
+                                all_frames = np.empty(frames_shape, np.uint8)
+                            
+                            # Captures opened by segments that fall back to OpenCV are
+                            # reused by later segments rather than opened per segment
+                            readers = queue.Queue()
+                            
+                            def extract_segment(index):
+                                seg_start, seg_duration, frame_count = clips[index]
+                                if frame_count <= 0:
+                                    return 0
+                                # Extract frames at proper intervals to achieve the desired speed,
+                                # cropped and resized to consistent dimensions across segments
+                                count = 0
+                                for _ in self._iter_clip_frames(seg_start, seg_duration, frame_count, dimensions, crop_rect,
+                                                                out=all_frames[offsets[index]:offsets[index + 1]],
+                                                                reader_pool=readers):
+                                    count += 1
+                                return count
+                            
+                            # Use imageio to write the gif with loop parameter
+                            loop_param = 0 if loop else 1
+                            writer = None
+                            written = 0
+                            
+                            # Segments are independent, so each is decoded on a capture or
+                            # ffmpeg process of its own in parallel; both release the GIL.
+                            # Each is streamed to the writer as soon as it and the ones
+                            # before it are done, so encoding overlaps the decoding
+                            try:
+                                with ThreadPoolExecutor(max_workers=min(len(segments), os.cpu_count() or 1)) as pool:
+                                    futures = [pool.submit(extract_segment, i) for i in range(len(clips))]
+                                    for i, future in enumerate(futures):
+                                        try:
+                                            count = future.result()
+                                        except Exception as frame_error:
+                                            print(f"Error processing frames of segment {i+1}: {frame_error}")
+                                            count = 0
                                         
-                                        if frame_time <= seg_duration:
-                                            try:
-                                                frame = clip.get_frame(frame_time)
-                                                
-                                                # Ensure frame has correct dimensions
-                                                if frame.shape[0] != target_height or frame.shape[1] != target_width:
-                                                    frame = cv2.resize(frame, (target_width, target_height))
-                                                    
-                                                segment_frames.append(frame)
-                                                
-                                                # Update progress periodically
-                                                if progress_callback and f % 5 == 0:
-                                                    progress = 40 + (i / len(segments) + (f / frame_count) / len(segments)) * 50
-                                                    progress_callback(min(89, int(progress)))
-                                            except Exception as frame_error:
-                                                print(f"Error processing frame at {frame_time}s: {frame_error}")
-                                                continue
-                                
-                                # Check segment frames before adding
-                                if segment_frames:
-                                    # Double-check all frames in this segment have the same dimensions
-                                    first_frame = segment_frames[0]
-                                    segment_frames = [frame for frame in segment_frames if frame.shape == first_frame.shape]
-                                    
-                                    # Add shapes debug info
-                                    if len(segment_frames) > 0:
-                                        print(f"Segment {i+1}: Adding {len(segment_frames)} frames with shape {segment_frames[0].shape}")
+                                        if count:
+                                            print(f"Segment {i+1}: Adding {count} frames with shape {all_frames.shape[1:]}")
+                                            if writer is None:
+                                                writer = self._open_gif_writer(output_path, all_frames.shape[1:], fps,
+                                                                               quality, loop_param)
+                                            for frame in all_frames[offsets[i]:offsets[i] + count]:
+                                                writer.append_data(frame)
+                                            written += count
                                         
-                                        # Only add frames if we have a non-empty segment
-                                        # If all_frames already has frames, ensure new frames match existing dimensions
-                                        if all_frames and segment_frames and segment_frames[0].shape != all_frames[0].shape:
-                                            print(f"Warning: Shape mismatch. Existing: {all_frames[0].shape}, New: {segment_frames[0].shape}")
-                                            # Resize all new frames to match existing frames
-                                            h, w = all_frames[0].shape[:2]
-                                            segment_frames = [cv2.resize(frame, (w, h)) for frame in segment_frames]
-                                            
-                                        all_frames.extend(segment_frames)
-                                clip.close()
+                                        if progress_callback:
+                                            progress_callback(min(99, int((i + 1) / len(segments) * 99)))
+                            finally:
+                                # Decoding is over, so free the captures' decoder buffers
+                                # before closing the writer, which waits for the encode
+                                while not readers.empty():
+                                    readers.get_nowait().release()
+                                if writer is not None:
+                                    writer.close()
                             
-                            if all_frames:
-                                # Verify all frames have the same shape
-                                first_frame_shape = all_frames[0].shape
-                                compatible_frames = []
-                                
-                                for i, frame in enumerate(all_frames):
-                                    if frame.shape == first_frame_shape:
-                                        compatible_frames.append(frame)
-                                    else:
-                                        try:
-                                            # Try to resize any mismatched frames
-                                            print(f"Resizing frame {i} from {frame.shape} to {first_frame_shape}")
-                                            resized = cv2.resize(frame, (first_frame_shape[1], first_frame_shape[0]))
-                                            compatible_frames.append(resized)
-                                        except Exception as e:
-                                            print(f"Could not resize frame {i}: {e}")
-                                
-                                # Replace frames with compatible frames
-                                if compatible_frames:
-                                    all_frames = compatible_frames
-                                    print(f"Final frame count after compatibility check: {len(all_frames)}")
-                                else:
-                                    print("No compatible frames after filtering!")
-                                    return False
-                                
-                                # Use imageio to write the gif with loop parameter
-                                loop_param = 0 if loop else 1
-                                
-                                if progress_callback:
-                                    progress_callback(90)  # Starting file write
-                                
-                                print(f"Writing GIF with {len(all_frames)} frames, shape: {all_frames[0].shape}")
-                                imageio.mimsave(output_path, all_frames, fps=fps, 
-                                                quantizer=int(100-quality*100), loop=loop_param)
-                                
+                            if written:
                                 if progress_callback:
                                     progress_callback(100)  # Complete
                                     
-                                print(f"Successfully created GIF with {len(all_frames)} frames from {len(segments)} segments")
+                                print(f"Successfully created GIF with {written} frames from {len(segments)} segments")
                                 return True
                             else:
                                 print("No frames were extracted")
@@ -369,8 +548,62 @@ class VideoProcessor:
                         return False
                 else:
                     # Standard single-segment GIF creation
+                    # Apply speed factor before writing the GIF
+                    if speed_factor != 1.0:
+                        # Extract frames with speed factor applied
+                        print(f"Applying speed factor of {speed_factor}x to segment {start_time:.2f}s-{end_time:.2f}s")
+                        clip_start = max(0, start_time)
+                        seg_duration = min(self.duration, end_time) - clip_start
+                        
+                        # Resize only if needed, as for the moviepy clip below
+                        frame_dimensions = dimensions
+                        if tuple(dimensions) == (self.width, self.height) and crop_rect is not None:
+                            frame_dimensions = (crop_rect[2], crop_rect[3])
+                        
+                        # Calculate how many frames we want in the final output
+                        # Apply speed factor to determine frame count
+                        # Higher speed = fewer frames
+                        frame_count = max(0, int(seg_duration * fps / speed_factor))
+                        
+                        # Write frames to GIF using imageio, streaming each one to the
+                        # writer as it is decoded; the writer is only opened once a
+                        # frame arrives, so a failed extraction leaves no file behind
+                        import imageio
+                        loop_param = 0 if loop else 1
+                        writer = None
+                        extracted = 0
+                        if frame_count > 0:
+                            try:
+                                for f, frame in enumerate(self._iter_clip_frames(clip_start, seg_duration, frame_count,
+                                                                                 frame_dimensions, crop_rect)):
+                                    if writer is None:
+                                        print(f"Writing GIF with frames of shape {frame.shape}")
+                                        writer = self._open_gif_writer(output_path, frame.shape, fps,
+                                                                       quality, loop_param)
+                                    writer.append_data(frame)
+                                    extracted += 1
+                                    
+                                    # Update progress periodically
+                                    if progress_callback and f % 5 == 0:
+                                        progress_percent = 30 + (f / frame_count * 60)
+                                        progress_callback(min(89, int(progress_percent)))
+                            except Exception as e:
+                                print(f"Error extracting frames: {e}")
+                            finally:
+                                if writer is not None:
+                                    writer.close()
+                        
+                        if extracted:
+                            if progress_callback:
+                                progress_callback(100)  # Complete the progress
+                                
+                            print(f"Created GIF with speed factor {speed_factor}x using {extracted} frames")
+                            return True
+                        else:
+                            print("No frames were extracted")
+                            # Fall through to standard methods
+                    
                     clip = VideoFileClip(self.video_path).subclip(start_time, end_time)
-                    seg_duration = clip.duration
                     
                     # Apply cropping if needed
                     if crop_rect is not None:
@@ -385,90 +618,6 @@ class VideoProcessor:
                     # Set output fps
                     clip = clip.set_fps(fps)
                     
-                    # Apply speed factor before writing the GIF
-                    if speed_factor != 1.0:
-                        # Extract frames with speed factor applied
-                        print(f"Applying speed factor of {speed_factor}x to segment {start_time:.2f}s-{end_time:.2f}s")
-                        frames = []
-                        
-                        # Get a sample frame to establish the correct dimensions
-                        sample_frame = clip.get_frame(0)
-                        correct_shape = sample_frame.shape
-                        
-                        # Calculate how many frames we want in the final output
-                        # Apply speed factor to determine frame count
-                        # Higher speed = fewer frames
-                        frame_count = int(seg_duration * fps / speed_factor)
-                        
-                        if frame_count > 0:
-                            # Calculate the time step between frames
-                            # For higher speeds, we take larger steps through the original clip
-                            time_step = seg_duration / frame_count
-                            
-                            for f in range(frame_count):
-                                # Calculate time point in the clip
-                                frame_time = f * time_step
-                                
-                                if frame_time <= seg_duration:
-                                    try:
-                                        frame = clip.get_frame(frame_time)
-                                        
-                                        # Ensure frame has the correct dimensions
-                                        if frame.shape != correct_shape:
-                                            print(f"Correcting frame shape from {frame.shape} to {correct_shape}")
-                                            frame = cv2.resize(frame, (correct_shape[1], correct_shape[0]))
-                                            
-                                        frames.append(frame)
-                                        
-                                        # Update progress periodically
-                                        if progress_callback and f % 5 == 0:
-                                            progress_percent = 30 + (f / frame_count * 60)
-                                            progress_callback(min(89, int(progress_percent)))
-                                    except Exception as e:
-                                        print(f"Error extracting frame at time {frame_time}: {e}")
-                                        continue
-                        
-                        # Verify all frames have the same shape before saving
-                        if frames:
-                            # Double-check that all frames have the same dimensions
-                            first_shape = frames[0].shape
-                            filtered_frames = []
-                            
-                            for i, frame in enumerate(frames):
-                                if frame.shape == first_shape:
-                                    filtered_frames.append(frame)
-                                else:
-                                    try:
-                                        # Try to resize any mismatched frames
-                                        print(f"Resizing frame {i} from {frame.shape} to {first_shape}")
-                                        resized = cv2.resize(frame, (first_shape[1], first_shape[0]))
-                                        filtered_frames.append(resized)
-                                    except Exception as e:
-                                        print(f"Could not resize frame {i}: {e}")
-                            
-                            frames = filtered_frames
-                            
-                            if frames:
-                                # Use progress callback if provided
-                                if progress_callback:
-                                    progress_callback(80)  # Report 80% progress after frame extraction
-                                    
-                                # Write frames to GIF using imageio
-                                import imageio
-                                loop_param = 0 if loop else 1
-                                print(f"Writing GIF with {len(frames)} frames, shape: {frames[0].shape}")
-                                imageio.mimsave(output_path, frames, fps=fps, quantizer=int(100-quality*100), loop=loop_param)
-                                
-                                if progress_callback:
-                                    progress_callback(100)  # Complete the progress
-                                    
-                                clip.close()
-                                print(f"Created GIF with speed factor {speed_factor}x using {len(frames)} frames")
-                                return True
-                            else:
-                                print("No valid frames after filtering")
-                                # Fall through to standard methods
-                    
                     # If no speed factor or frame extraction failed, try the standard methods
                     # Use progress callback if provided
                     if progress_callback:
@@ -497,26 +646,33 @@ class VideoProcessor:
                             # Last resort - try to use imageio directly
                             try:
                                 print("Trying direct imageio method...")
-                                import imageio
-                                # Get frames from the clip
-                                frames = []
-                                # Apply speed factor to frame extraction
-                                for t in range(int(clip.duration * fps)):
-                                    # Apply speed factor by adjusting the time point we sample
-                                    frame_time = (t / fps) * speed_factor
-                                    if frame_time <= clip.duration:
+                                # Stream each sampled frame straight to the writer,
+                                # opened at the first frame so nothing is written
+                                # when the clip yields none
+                                writer = None
+                                written = 0
+                                # Apply speed factor by adjusting the time points we sample;
+                                # they only grow, so those inside the clip are a prefix
+                                frame_times = np.arange(int(clip.duration * fps)) / fps * speed_factor
+                                try:
+                                    for t, frame_time in enumerate(frame_times[frame_times <= clip.duration].tolist()):
                                         frame = clip.get_frame(frame_time)
-                                        frames.append(frame)
+                                        if writer is None:
+                                            writer = self._open_gif_writer(output_path, frame.shape, fps,
+                                                                           quality, loop_param)
+                                        writer.append_data(frame)
+                                        written += 1
                                         if progress_callback and t % 5 == 0:  # Update progress periodically
                                             progress_percent = 30 + (t / (clip.duration * fps) * 60)
                                             progress_callback(min(89, int(progress_percent)))
+                                finally:
+                                    if writer is not None:
+                                        writer.close()
 
-                                if frames:
-                                    # Use imageio to write the gif with loop parameter
-                                    imageio.mimsave(output_path, frames, fps=fps, quantizer=int(100-quality*100), loop=loop_param)
+                                if written:
                                     if progress_callback:
                                         progress_callback(90)
-                                    print(f"Successfully created GIF using imageio with {len(frames)} frames")
+                                    print(f"Successfully created GIF using imageio with {written} frames")
                                 else:
                                     print("No frames were extracted")
                                     return False
@@ -534,24 +690,231 @@ class VideoProcessor:
             print(f"Error creating GIF: {str(e)}")
             return False
     
+    def _open_gif_writer(self, output_path, frame_shape, fps, quality, loop_param):
+        """Return a writer for (H, W, 3) RGB frames, ffmpeg's when available, else imageio's"""
+        if FFMPEG_EXE is not None:
+            return FfmpegGifWriter(output_path, frame_shape[1], frame_shape[0], fps, quality, loop_param)
+        import imageio
+        return imageio.get_writer(output_path, mode='I', fps=fps,
+                                  quantizer=int(100-quality*100), loop=loop_param)
+    
+    def open_reader(self):
+        """Return a VideoProcessor for the same video with a capture of its own
+        
+        Lets a worker thread decode frames while the UI keeps seeking self.cap;
+        OpenCV captures must not be shared between threads.
+        """
+        reader = VideoProcessor()
+        reader.video_path = self.video_path
+        reader.fps = self.fps
+        reader.frame_count = self.frame_count
+        reader.duration = self.duration
+        reader.width = self.width
+        reader.height = self.height
+        reader._frame_cache = self._frame_cache
+        reader._open_capture(self.video_path)
+        return reader
+    
+    def release(self):
+        """Release the capture"""
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        self._next_frame = -1
+    
+    def close(self):
+        """Release the capture and drop cached frames and scratch buffers
+        
+        Readers from open_reader share the frame cache, so only this
+        processor's reference to it is dropped.
+        """
+        self.release()
+        self._frame_cache = FrameCache()
+        self._resize_scratch = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
     def get_dimensions(self):
         """Return the dimensions of the loaded video"""
         return self.width, self.height
     
     def get_frame(self, frame_number):
         """Get a specific frame by number"""
+        frame = self._read_bgr(frame_number)
+        if frame is None:
+            return None
+            
+        # Convert from BGR to RGB
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    
+    def _read_bgr(self, frame_number):
+        """Decode a frame in OpenCV's native BGR order, or None on failure"""
         if not self.cap or not self.cap.isOpened():
             return None
         
         # Set position to the requested frame
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        self._seek(frame_number)
         ret, frame = self.cap.read()
         
         if not ret:
+            self._next_frame = -1
             return None
-            
-        # Convert from BGR to RGB
-        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        self._next_frame = frame_number + 1
+        return frame
+    
+    def _read_bgr_cached(self, frame_number):
+        """Like _read_bgr, but serve and fill the shared frame cache
+        
+        Cached frames are shared, so callers must not modify them.
+        """
+        frame = self._frame_cache.get(frame_number)
+        if frame is None:
+            frame = self._read_bgr(frame_number)
+            if frame is not None:
+                self._frame_cache.put(frame_number, frame)
+        return frame
+    
+    def _process_to_rgb(self, frame, dimensions, crop_rect=None, out=None):
+        """Crop and resize a BGR frame, then convert only the result to RGB
+        
+        Converting after the downscale touches far fewer pixels than
+        converting the decoded frame; out optionally receives the result.
+        """
+        if frame is None:
+            return None
+        if crop_rect is not None:
+            x, y, w, h = crop_rect
+            frame = frame[y:y+h, x:x+w]
+        
+        # Scale into one scratch buffer reused across frames; only the RGB
+        # result needs memory of its own
+        target_width, target_height = dimensions
+        if target_width != frame.shape[1] or target_height != frame.shape[0]:
+            if self._resize_scratch is None or self._resize_scratch.shape != (target_height, target_width, 3):
+                self._resize_scratch = np.empty((target_height, target_width, 3), np.uint8)
+            frame = cv2.resize(frame, (target_width, target_height), dst=self._resize_scratch)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=out)
+    
+    def _iter_clip_frames(self, clip_start, clip_duration, frame_count, dimensions, crop_rect=None, out=None,
+                          reader_pool=None):
+        """Yield frame_count frames evenly spaced over a clip, cropped, resized and in RGB
+        
+        ffmpeg does the whole job when it is available; otherwise OpenCV
+        walks the clip forward once, decoding each source frame at most once
+        instead of seeking for every output frame. out optionally receives
+        the frames, one per row of a (frame_count, H, W, 3) array, and
+        reader_pool optionally holds open readers to reuse (and put back)
+        instead of opening a capture for this clip alone.
+        """
+        if FFMPEG_EXE is not None:
+            # Decode on the GPU through NVDEC when the NVIDIA stack is there;
+            # ffmpeg gives up rather than falling back, so retry on the CPU
+            for hwaccel in ([self._ffmpeg_hwaccel] if self._ffmpeg_hwaccel else []) + [None]:
+                count = 0
+                try:
+                    for frame in self._iter_ffmpeg_frames(clip_start, clip_duration, frame_count, dimensions,
+                                                          crop_rect, out, hwaccel):
+                        count += 1
+                        yield frame
+                except Exception as e:
+                    if count:
+                        raise
+                    print(f"ffmpeg decoding failed{' with ' + hwaccel if hwaccel else ''}: {e}")
+                if count:
+                    return
+                if hwaccel:
+                    self._ffmpeg_hwaccel = None
+            print("Decoding GIF frames with OpenCV")
+        
+        time_step = clip_duration / frame_count
+        # The epsilon keeps times that land on a frame boundary, such as
+        # 0.5 + 2/6 s at 30 fps, from truncating to the frame before it
+        positions = ((clip_start + np.arange(frame_count) * time_step) * self.fps + 1e-6).astype(np.int64).tolist()
+        
+        # Borrow an open capture when the caller pools them across clips
+        reader = None
+        if reader_pool is not None:
+            try:
+                reader = reader_pool.get_nowait()
+            except queue.Empty:
+                pass
+        if reader is None:
+            reader = self.open_reader()
+        try:
+            reader.cap.set(cv2.CAP_PROP_POS_FRAMES, positions[0])
+            next_frame = positions[0]
+            frame = None
+            for i, position in enumerate(positions):
+                target = None if out is None else out[i]
+                if position >= next_frame:
+                    for _ in range(position - next_frame):
+                        if not reader.cap.grab():
+                            return
+                    ret, bgr = reader.cap.read()
+                    if not ret:
+                        return
+                    next_frame = position + 1
+                    frame = reader._process_to_rgb(bgr, dimensions, crop_rect, out=target)
+                elif target is not None:
+                    # Slow playback samples a source frame more than once
+                    target[...] = frame
+                    frame = target
+                yield frame
+        finally:
+            if reader_pool is not None:
+                reader_pool.put(reader)
+            else:
+                reader.release()
+    
+    def _iter_ffmpeg_frames(self, clip_start, clip_duration, frame_count, dimensions, crop_rect=None, out=None,
+                            hwaccel=None):
+        """Yield the frames of _iter_clip_frames from one ffmpeg crop, scale and fps filter graph
+        
+        The frames arrive as raw RGB over a pipe, scaled by swscale, so
+        Python never touches a full-size frame. hwaccel optionally names an
+        ffmpeg hardware decoder; decoded frames are downloaded for the filters.
+        """
+        target_width, target_height = int(dimensions[0]), int(dimensions[1])
+        filters = []
+        source_size = (self.width, self.height)
+        if crop_rect is not None:
+            x, y, w, h = (int(v) for v in crop_rect)
+            filters.append(f"crop={w}:{h}:{x}:{y}")
+            source_size = (w, h)
+        # Skip the swscale pass when the frames already have the target size
+        if source_size != (target_width, target_height):
+            filters.append(f"scale={target_width}:{target_height}:flags=lanczos")
+        # Sampling at frame_count frames over the clip applies the speed factor;
+        # rounding up keeps, per output frame, the last source frame at or
+        # before its time, the same frames the OpenCV path picks
+        filters.append(f"fps={frame_count / clip_duration:.6f}:round=up")
+        
+        cmd = [FFMPEG_EXE, '-v', 'error']
+        if hwaccel:
+            cmd += ['-hwaccel', hwaccel]
+        cmd += ['-ss', f"{clip_start:.6f}", '-t', f"{clip_duration:.6f}",
+                '-i', self.video_path, '-vf', ','.join(filters), '-frames:v', str(frame_count),
+                '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-']
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            frame_size = target_width * target_height * 3
+            for i in range(frame_count):
+                frame = np.empty((target_height, target_width, 3), np.uint8) if out is None else out[i]
+                if proc.stdout.readinto(memoryview(frame).cast('B')) != frame_size:
+                    break
+                yield frame
+            if proc.wait() != 0:
+                raise RuntimeError(proc.stderr.read().decode(errors='replace').strip())
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+            proc.stderr.close()
+            proc.wait()
     
     def get_frame_at_time(self, time_seconds):
         """Get a frame at a specific time point"""
@@ -561,51 +924,125 @@ class VideoProcessor:
         frame_number = int(time_seconds * self.fps)
         return self.get_frame(frame_number)
     
-    def get_thumbnails(self, count=10):
-        """Generate thumbnails across the video duration"""
-        thumbnails = []
-        
+    def get_thumbnail_positions(self, count=10):
+        """Return the frame numbers used for evenly distributed thumbnails"""
         if not self.cap or not self.cap.isOpened() or self.frame_count == 0:
-            return thumbnails
+            return []
             
-        # Calculate frame intervals for evenly distributed thumbnails
+        # Evenly distributed thumbnails with a fractional step, so the tail
+        # past a multiple of count is covered too; the last frame itself is
+        # never used since the reported frame count is often one too high
         if self.frame_count <= count:
-            frames_to_extract = range(self.frame_count)
-        else:
-            step = self.frame_count // count
-            frames_to_extract = range(0, self.frame_count, step)[:count]
+            return list(range(self.frame_count))
+        return np.linspace(0, self.frame_count, count, endpoint=False).astype(np.int64).tolist()
+    
+    def iter_thumbnails(self, count=10, out=None):
+        """Yield (index, thumbnail) pairs across the video duration
         
-        # Extract frames
-        for frame_num in frames_to_extract:
-            frame = self.get_frame(frame_num)
-            if frame is not None:
-                # Resize for thumbnail
-                thumb_height = 60
-                thumb_width = int(self.width * thumb_height / self.height)
-                thumbnail = cv2.resize(frame, (thumb_width, thumb_height))
-                thumbnails.append(thumbnail)
+        Uses captures of its own rather than self.cap, so it can run on a
+        worker thread while the UI keeps seeking with get_frame. With several
+        cores the thumbnails are split across threads and may arrive out of
+        order. When out is an (N, H, W, 3) array, thumbnail i is written to
+        and yielded as out[i].
+        """
+        frames_to_extract = self.get_thumbnail_positions(count)
+        if not frames_to_extract:
+            return
+        
+        jobs = list(enumerate(frames_to_extract))
+        workers = min(os.cpu_count() or 1, len(jobs))
+        if workers <= 1:
+            yield from self._decode_thumbnails(jobs, out)
+            return
+        
+        # Each thread decodes every n-th thumbnail on a capture of its own;
+        # OpenCV releases the GIL while seeking and decoding
+        results = queue.Queue()
+        stop = threading.Event()
         
-        return thumbnails
+        def decode_share(share):
+            try:
+                for item in self._decode_thumbnails(share, out):
+                    if stop.is_set():
+                        break
+                    results.put(item)
+            except Exception as e:
+                results.put(e)
+            finally:
+                results.put(None)
+        
+        for k in range(workers):
+            threading.Thread(target=decode_share, args=(jobs[k::workers],), daemon=True).start()
+        finished = 0
+        try:
+            while finished < workers:
+                item = results.get()
+                if item is None:
+                    finished += 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            # Lets the threads stop early when the caller stops iterating
+            stop.set()
     
-    def _apply_processing(self, frame, dimensions, crop_rect=None):
-        """Apply processing to a frame"""
-        if frame is None:
-            return None
-            
-        # Apply cropping if specified
-        if crop_rect is not None:
-            x, y, w, h = crop_rect
-            frame = frame[y:y+h, x:x+w]
+    def _decode_thumbnails(self, jobs, out=None):
+        """Decode thumbnails for (index, frame number) jobs on a new capture, yielding (index, thumbnail)
         
-        # Resize if needed
-        target_width, target_height = dimensions
-        if target_width != frame.shape[1] or target_height != frame.shape[0]:
-            frame = cv2.resize(frame, (target_width, target_height))
+        Positions come in increasing order, so short videos grab forward
+        between thumbnails instead of seeking.
+        """
+        thumb_height, thumb_width = self.thumbnail_shape()
+        # The downscale lands in one reused BGR buffer; only the RGB result
+        # gets memory of its own
+        scratch = np.empty((thumb_height, thumb_width, 3), np.uint8)
+        reader = self.open_reader()
+        try:
+            for i, frame_num in jobs:
+                frame = reader._read_bgr(frame_num)
+                if frame is None:
+                    continue
+                
+                # Resize for thumbnail, converting only the small result to RGB;
+                # area averaging keeps the large scale-down from aliasing
+                cv2.resize(frame, (thumb_width, thumb_height), dst=scratch,
+                           interpolation=cv2.INTER_AREA)
+                yield i, cv2.cvtColor(scratch, cv2.COLOR_BGR2RGB,
+                                      dst=None if out is None else out[i])
+        finally:
+            reader.release()
+    
+    def thumbnail_shape(self):
+        """Return the (height, width) of timeline thumbnails"""
+        thumb_height = 60
+        return thumb_height, int(self.width * thumb_height / self.height)
+    
+    def get_thumbnails(self, count=10):
+        """Generate thumbnails across the video duration
         
-        return frame
+        Returns:
+            Contiguous (N, H, W, 3) uint8 RGB array, empty when nothing could be read
+        """
+        positions = self.get_thumbnail_positions(count)
+        if not positions:
+            return np.empty((0, 0, 0, 3), np.uint8)
+        
+        # Thumbnails are converted straight into one preallocated array
+        thumbnails = np.empty((len(positions),) + self.thumbnail_shape() + (3,), np.uint8)
+        indices = sorted(i for i, _ in self.iter_thumbnails(count, out=thumbnails))
+        if len(indices) == len(positions):
+            return thumbnails
+        if not indices:
+            return np.empty((0, 0, 0, 3), np.uint8)
+        return thumbnails[indices]
     
-    def generate_preview(self, start_time, end_time, fps, dimensions, quality, crop_rect=None, segments=None, speed_factor=1.0):
-        """Generate a preview of the GIF with current settings
+    def generate_preview_iter(self, start_time, end_time, fps, dimensions, quality, crop_rect=None, segments=None, speed_factor=1.0, progress_callback=None):
+        """Yield preview frames of the GIF with current settings as they become ready
+        
+        Playback runs at fps * speed_factor. A single segment decoded with
+        OpenCV streams frame by frame, the GPU and parallel segment paths
+        yield once they finish.
         
         Args:
             start_time: Start time for the primary segment
@@ -617,89 +1054,324 @@ class VideoProcessor:
             segments: Optional list of (start, end) tuples to include in the preview
                      If provided, these override the start_time and end_time parameters
             speed_factor: Speed multiplier for the GIF (>1 is faster, <1 is slower)
+            progress_callback: Optional function called with 0-100 as frames are collected
         """
         if not self.cap or not self.cap.isOpened():
-            return []
+            return
             
-        preview_frames = []
-        
-        # Adjust FPS based on speed factor
-        adjusted_fps = fps * speed_factor
-        
-        if segments:
-            # Process each segment for preview
-            for seg_start, seg_end in segments:
-                # Calculate frame numbers for this segment
-                seg_start_frame = int(seg_start * self.fps)
-                seg_end_frame = int(seg_end * self.fps)
-                seg_duration = seg_end - seg_start
-                
-                # How many frames to capture for this segment at the target fps
-                # Apply speed factor to determine how many frames to extract
-                seg_desired_frames = int(seg_duration * fps)
-                seg_total_frames = seg_end_frame - seg_start_frame
-                
-                # Adjust frame step by speed factor
-                # Higher speed factor = larger step = fewer frames
-                seg_frame_step = (seg_total_frames / seg_desired_frames) * speed_factor if seg_desired_frames > 0 else 1
-                
-                # Collect frames for this segment
-                seg_current_frame = seg_start_frame
-                seg_frame_count = 0
-                
-                while seg_current_frame < seg_end_frame and seg_frame_count < seg_desired_frames:
-                    # Get frame at calculated position
-                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, int(seg_current_frame))
-                    frame = self.get_frame(int(seg_current_frame))
-                    
-                    if frame is not None:
-                        processed = self._apply_processing(frame, dimensions, crop_rect)
-                        if processed is not None:
-                            preview_frames.append(processed)
-                            seg_frame_count += 1
-                    
-                    # Move to next frame position with speed factor adjustment
-                    seg_current_frame += seg_frame_step
-        else:
-            # Standard single segment preview
-            # Calculate frame numbers and timing
-            start_frame = int(start_time * self.fps)
-            end_frame = int(end_time * self.fps)
-            duration = end_time - start_time
+        yield from self._preview_source(start_time, end_time, fps, dimensions, crop_rect,
+                                        segments, speed_factor, progress_callback)
+    
+    def preview_frame_count(self, start_time, end_time, fps, segments=None, speed_factor=1.0):
+        """Return the most frames a preview with these settings can produce"""
+        plan = self._preview_plan(start_time, end_time, fps, segments, speed_factor)
+        return sum(desired for _, desired in plan)
+    
+    def _preview_source(self, start_time, end_time, fps, dimensions, crop_rect, segments, speed_factor, progress_callback):
+        """Pick the decoding path for a preview and return its frames as an array or generator"""
+        # Nothing can be resized to an empty frame
+        if dimensions[0] <= 0 or dimensions[1] <= 0:
+            return np.empty((0, 0, 0, 3), np.uint8)
+        
+        plan = self._preview_plan(start_time, end_time, fps, segments, speed_factor)
+        
+        # NVDEC cannot read GIFs, and any GPU failure falls back to OpenCV
+        if NVDEC_AVAILABLE and not self.video_path.lower().endswith('.gif'):
+            try:
+                return self._collect_frames_nvdec(plan, dimensions, crop_rect, progress_callback)
+            except Exception as e:
+                print(f"GPU preview decoding failed, using OpenCV: {e}")
+        
+        # Separate segments are independent, so each can be decoded on its own
+        # capture in parallel
+        if len([1 for positions, desired in plan if positions and desired]) > 1:
+            return self._collect_frames_parallel(plan, dimensions, crop_rect, progress_callback)
+        return self._iter_frames(plan, dimensions, crop_rect, progress_callback)
+    
+    def _preview_plan(self, start_time, end_time, fps, segments, speed_factor):
+        """Work out which source frames a preview samples
+        
+        Returns:
+            List of (positions, desired) per segment, where positions are the
+            candidate frame numbers in order and desired is how many of them
+            the segment should contribute at most
+        """
+        plan = []
+        for seg_start, seg_end in (segments if segments else [(start_time, end_time)]):
+            # Calculate frame numbers for this segment
+            seg_start_frame = int(seg_start * self.fps)
+            seg_end_frame = int(seg_end * self.fps)
             
-            # Calculate frame selection accounting for speed factor
-            desired_frames = int(duration * fps)  # Number of frames needed for target fps
-            total_frames = end_frame - start_frame
+            # How many frames to capture for this segment at the target fps
+            seg_desired_frames = int((seg_end - seg_start) * fps)
+            seg_total_frames = seg_end_frame - seg_start_frame
+            if seg_desired_frames <= 0:
+                plan.append(([], 0))
+                continue
             
             # Adjust frame step by speed factor
             # Higher speed factor = larger step = fewer frames
-            frame_step = (total_frames / desired_frames) * speed_factor if desired_frames > 0 else 1
+            seg_frame_step = (seg_total_frames / seg_desired_frames) * speed_factor
             
-            # Collect frames for the preview
-            current_frame = start_frame
-            frame_count = 0
-            
-            while current_frame < end_frame and frame_count < desired_frames:
-                # Get frame at calculated position
-                self.cap.set(cv2.CAP_PROP_POS_FRAMES, int(current_frame))
-                frame = self.get_frame(int(current_frame))
-                
-                if frame is not None:
-                    processed = self._apply_processing(frame, dimensions, crop_rect)
-                    if processed is not None:
-                        preview_frames.append(processed)
-                        frame_count += 1
-                
-                # Move to next frame position with speed factor adjustment
-                current_frame += frame_step
+            # Every position is start + i * step, computed at once rather than
+            # accumulated so long segments do not drift (the epsilon keeps
+            # exact products from truncating to the frame below)
+            steps = int(np.ceil(seg_total_frames / seg_frame_step)) if seg_total_frames > 0 else 0
+            offsets = np.arange(steps) * seg_frame_step
+            positions = (seg_start_frame + offsets + 1e-6).astype(np.int64)
+            positions = positions[positions < seg_end_frame].tolist()
+            # Fast playback can run out of frames before reaching the target
+            plan.append((positions, min(seg_desired_frames, len(positions))))
+        return plan
+    
+    def _iter_frames(self, plan, dimensions, crop_rect, progress_callback=None):
+        """Decode and process the frames of a preview plan with OpenCV, yielding each in order
+        
+        With more than one core, decoding runs on a producer thread while
+        this one crops, resizes and converts; OpenCV releases the GIL for both.
+        """
+        # Upper bound on the frames collected, used only to report progress
+        expected_frames = max(1, sum(desired for _, desired in plan))
+        collected = 0
+        # Bound once, the loop below runs per frame
+        process_to_rgb = self._process_to_rgb
+        processed = None
+        
+        if (os.cpu_count() or 1) > 1:
+            source = self._decode_plan_threaded(plan)
+        else:
+            source = self._decode_plan(plan)
+        try:
+            for frame in source:
+                if frame is None:
+                    # Repeat of the previous source frame
+                    processed = processed.copy()
+                else:
+                    processed = process_to_rgb(frame, dimensions, crop_rect)
+                collected += 1
+                if progress_callback:
+                    progress_callback(min(100, int(collected * 100 / expected_frames)))
+                yield processed
+        finally:
+            # Stops a producer thread before the caller releases the capture
+            source.close()
+    
+    def _decode_plan(self, plan):
+        """Yield the BGR source frames of a preview plan in order, None for a repeated frame
+        
+        Slow motion samples the same source frame repeatedly; seeking back
+        to decode it again would flush the decoder, so repeats are left to
+        the caller.
+        """
+        read_bgr = self._read_bgr_cached
+        for positions, desired in plan:
+            count = 0
+            last_position = -1
+            for position in positions:
+                if count >= desired:
+                    break
+                if position == last_position:
+                    yield None
+                else:
+                    # Get frame at calculated position, from the cache when an
+                    # earlier preview decoded it, else grabbing forward when close
+                    frame = read_bgr(position)
+                    if frame is None:
+                        continue
+                    last_position = position
+                    yield frame
+                count += 1
+    
+    def _decode_plan_threaded(self, plan):
+        """Like _decode_plan, but decode on a producer thread a few frames ahead"""
+        # The bounded queue caps how many full-size frames are waiting
+        decoded = queue.Queue(maxsize=4)
+        stop = threading.Event()
+        done = object()
         
-        return preview_frames, adjusted_fps
+        def decode_frames():
+            try:
+                for frame in self._decode_plan(plan):
+                    if stop.is_set():
+                        break
+                    decoded.put(frame)
+            except Exception as e:
+                decoded.put(e)
+            finally:
+                decoded.put(done)
+        
+        producer = threading.Thread(target=decode_frames, daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = decoded.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Unblock and finish the producer if the consumer stopped early
+            stop.set()
+            while producer.is_alive():
+                try:
+                    decoded.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+    
+    def _collect_frames_parallel(self, plan, dimensions, crop_rect, progress_callback=None):
+        """Decode the segments of a preview plan concurrently, one capture per segment
+        
+        Each segment writes into its own slice of one preallocated
+        (N, H, W, 3) array; OpenCV releases the GIL while decoding, so the
+        threads run in parallel.
+        
+        Returns:
+            (N, H, W, 3) uint8 array
+        """
+        target_width, target_height = dimensions
+        offsets = np.concatenate([[0], np.cumsum([desired for _, desired in plan])])
+        buffer = np.empty((offsets[-1], target_height, target_width, 3), np.uint8)
+        
+        expected_frames = max(1, int(offsets[-1]))
+        progress_lock = threading.Lock()
+        collected = [0]
+        
+        def decode_segment(index):
+            positions, desired = plan[index]
+            reader = self.open_reader()
+            # Per-frame invariants bound once; a plain int start avoids numpy
+            # scalar arithmetic for every slot
+            read_bgr = reader._read_bgr_cached
+            process_to_rgb = reader._process_to_rgb
+            start = int(offsets[index])
+            count = 0
+            last_position = -1
+            try:
+                for position in positions:
+                    if count >= desired:
+                        break
+                    slot = start + count
+                    if position == last_position:
+                        # Repeated source frame, copy it rather than seek back
+                        buffer[slot] = buffer[slot - 1]
+                    else:
+                        frame = read_bgr(position)
+                        if frame is None:
+                            continue
+                        process_to_rgb(frame, dimensions, crop_rect, out=buffer[slot])
+                        last_position = position
+                    count += 1
+                    if progress_callback:
+                        with progress_lock:
+                            collected[0] += 1
+                            percent = min(100, int(collected[0] * 100 / expected_frames))
+                        progress_callback(percent)
+            finally:
+                reader.release()
+            return count
+        
+        workers = min(os.cpu_count() or 1, len(plan))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            counts = list(executor.map(decode_segment, range(len(plan))))
+        
+        # Segments that ran short leave gaps; close them up
+        if sum(counts) == offsets[-1]:
+            return buffer
+        return np.concatenate([buffer[offsets[i]:offsets[i] + count] for i, count in enumerate(counts)])
+    
+    def _collect_frames_nvdec(self, plan, dimensions, crop_rect, progress_callback=None):
+        """Decode, resize and convert the frames of a preview plan on the GPU
+        
+        Frames are downloaded straight into one (N, H, W, 3) RGB array. Crops
+        are still applied on the CPU since they come before the resize.
+        
+        Returns:
+            (N, H, W, 3) uint8 array
+        """
+        gpu_id = 0
+        decoder = nvc.PyNvDecoder(self.video_path, gpu_id)
+        src_width, src_height = decoder.Width(), decoder.Height()
+        
+        # Only resize on the GPU when nothing has to be cropped first
+        if crop_rect is None:
+            out_width, out_height = dimensions
+        else:
+            out_width, out_height = src_width, src_height
+        resizer = None
+        if (out_width, out_height) != (src_width, src_height):
+            resizer = nvc.PySurfaceResizer(out_width, out_height, nvc.PixelFormat.NV12, gpu_id)
+        cc_ctx = nvc.ColorspaceConversionContext(nvc.ColorSpace.BT_601, nvc.ColorRange.MPEG)
+        try:
+            to_yuv = nvc.PySurfaceConverter(out_width, out_height, nvc.PixelFormat.NV12,
+                                            nvc.PixelFormat.YUV420, gpu_id)
+            to_rgb = nvc.PySurfaceConverter(out_width, out_height, nvc.PixelFormat.YUV420,
+                                            nvc.PixelFormat.RGB, gpu_id)
+            downloader = nvc.PySurfaceDownloader(out_width, out_height, nvc.PixelFormat.RGB, gpu_id)
+            nv12 = None
+        except Exception as e:
+            # Without the GPU converters, download NV12 and convert it on the
+            # CPU in one pass straight into the preview buffer
+            print(f"GPU color conversion unavailable, converting on the CPU: {e}")
+            to_yuv = to_rgb = None
+            downloader = nvc.PySurfaceDownloader(out_width, out_height, nvc.PixelFormat.NV12, gpu_id)
+            nv12 = np.empty((out_height * 3 // 2, out_width), np.uint8)
+        
+        expected_frames = sum(desired for _, desired in plan)
+        buffer = np.empty((expected_frames, out_height, out_width, 3), np.uint8)
+        count = 0
+        decoded = -1  # Frame number of the last decoded surface
+        
+        for positions, desired in plan:
+            for position in positions[:desired]:
+                if position == decoded and count > 0:
+                    # Slow motion samples the same source frame repeatedly
+                    buffer[count] = buffer[count - 1]
+                else:
+                    if decoded < 0 or position < decoded or position - decoded > MAX_FORWARD_GRAB:
+                        surface = decoder.DecodeSingleSurface(nvc.SeekContext(position))
+                    else:
+                        # Decoding forward on the GPU is cheaper than a seek
+                        while decoded < position:
+                            surface = decoder.DecodeSingleSurface()
+                            decoded += 1
+                    decoded = position
+                    if surface.Empty():
+                        break
+                        
+                    if resizer is not None:
+                        surface = resizer.Execute(surface)
+                    if nv12 is not None:
+                        if surface.Empty() or not downloader.DownloadSingleSurface(
+                                surface, nv12.reshape(-1)):
+                            break
+                        cv2.cvtColor(nv12, cv2.COLOR_YUV2RGB_NV12, dst=buffer[count])
+                    else:
+                        surface = to_rgb.Execute(to_yuv.Execute(surface, cc_ctx), cc_ctx)
+                        if surface.Empty() or not downloader.DownloadSingleSurface(
+                                surface, buffer[count].reshape(-1)):
+                            break
+                        
+                count += 1
+                if progress_callback:
+                    progress_callback(min(100, int(count * 100 / max(1, expected_frames))))
+        
+        frames = buffer[:count]
+        if crop_rect is not None and count:
+            # Crop and scale every frame straight into one preallocated tensor
+            x, y, w, h = crop_rect
+            target_width, target_height = dimensions
+            scaled = np.empty((count, target_height, target_width, 3), np.uint8)
+            for i in range(count):
+                cv2.resize(frames[i, y:y+h, x:x+w], (target_width, target_height), dst=scaled[i])
+            frames = scaled
+        return frames
     
     def is_loaded(self):
         """Check if a video is loaded"""
         return self.cap is not None and self.cap.isOpened()
     
     def __del__(self):
-        """Clean up resources"""
+        """Clean up resources if close was never called"""
         if self.cap is not None:
             self.cap.release()
\ No newline at end of file